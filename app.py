@@ -2,9 +2,18 @@ import dash
 from dash import html, dcc, Output, Input, State, ALL, no_update
 import dash_leaflet as dl
 import os
+import json
 from config.helpers import *
 from config.schema import EVENTS_SCHEMA
-from services.data_loader import load_places_and_events
+from services.data_loader import (
+    load_places_and_events, fetch_record_changes, apply_record_changes, start_of_today
+)
+from services import metrics, profiling
+from services.http_caching import enable_compression, enable_conditional_get
+from services.search import build_search_index
+from services.snapshots import LRUCache, SnapshotStore
+from services.tiles import register_tile_routes
+from services.webhooks import PayloadCursor, WebhookRefresher, register_webhook_routes
 from flask_caching import Cache
 
 from dotenv import load_dotenv
@@ -15,6 +24,10 @@ AIRTABLE_API_KEY = os.getenv('AIRTABLE_API_KEY')
 AIRTABLE_BASE_ID = os.getenv('AIRTABLE_BASE_ID')
 AIRTABLE_PLACES_TABLE_ID = os.getenv('AIRTABLE_PLACES_TABLE_ID')
 AIRTABLE_EVENTS_TABLE_ID = os.getenv('AIRTABLE_EVENTS_TABLE_ID')
+# Optional: Airtable webhook pushing changes to /airtable/webhook (needs both)
+AIRTABLE_WEBHOOK_ID = os.getenv('AIRTABLE_WEBHOOK_ID')
+AIRTABLE_WEBHOOK_SECRET = os.getenv('AIRTABLE_WEBHOOK_SECRET')
+WEBHOOK_ENABLED = bool(AIRTABLE_WEBHOOK_ID and AIRTABLE_WEBHOOK_SECRET)
 
 MAP_CENTER = [43.65, -79.38]
 LOCATION_PRESETS = {
@@ -25,12 +38,23 @@ LOCATION_PRESETS = {
     "Scarborough": {"center": [43.77, -79.25], "zoom": 12}
 }
 EVENTS_PILL = "Only Places with Events"
+# Initial and preset views (per map size) whose sidebar is kept per snapshot
+SIDEBAR_CACHE_SIZE = 64
+# The cache and snapshots are per process, and a webhook notification only
+# reaches one of them: with more than one worker (gunicorn's WEB_CONCURRENCY),
+# the others still have to reload the data regularly
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY') or 1)
+SHORT_CACHE_TIMEOUT = 300
+# With a webhook pushing changes, cached data only needs to roll over with the date
+CACHE_TIMEOUT = 24 * 3600 if WEBHOOK_ENABLED and WEB_CONCURRENCY == 1 else SHORT_CACHE_TIMEOUT
 EVENT_TIME_WINDOW_DAYS = 14
 EVENT_TIME_WINDOWS = [
     {"label": "Within 7 days", "value": 7},
     {"label": "Within 2 weeks", "value": 14},
     {"label": "Within 1 month", "value": 30},
 ]
+# Large window used to get all types regardless of the selected window
+ALL_TYPES_WINDOW_DAYS = 999
 
 if not (AIRTABLE_API_KEY and AIRTABLE_BASE_ID and AIRTABLE_PLACES_TABLE_ID and AIRTABLE_EVENTS_TABLE_ID):
     raise RuntimeError("Missing Airtable environment variables (API key, base id, places table id, or events table id).")
@@ -50,7 +74,17 @@ app = dash.Dash(
     ]
 )
 
-cache = Cache(app.server, config={"CACHE_TYPE": "SimpleCache", "CACHE_DEFAULT_TIMEOUT": 300})
+cache = Cache(app.server, config={"CACHE_TYPE": "SimpleCache", "CACHE_DEFAULT_TIMEOUT": CACHE_TIMEOUT})
+
+# brotli/gzip responses, and 304s for unchanged layout/dependencies. Registered
+# before the metrics hook so response sizes are measured before compression
+enable_compression(app.server)
+enable_conditional_get(app.server)
+
+# Record latency/size/trigger of every callback below and expose them at /metrics
+metrics.instrument_app(app)
+# Opt-in flamegraph dumps for sampled/slow callback requests (see services/profiling.py)
+profiling.instrument_app(app)
 
 app.title = "Toronto Builders Guide"
 app.layout = html.Div([
@@ -84,16 +118,28 @@ app.layout = html.Div([
     html.Div([
         html.Div([
             html.Div(id="pill-container",
-                     className="pill-container")
+                     className="pill-container"),
+            # Search box with typeahead suggestions
+            dcc.Input(
+                id="search-input",
+                type="search",
+                placeholder="🔍 Search places, types, notes...",
+                debounce=0.3,
+                list="search-suggestions",
+                className="search-input"
+            ),
+            html.Datalist(id="search-suggestions")
         ], className="filter-content")
     ], className="filter-container"),
     
     # Hidden stores
+    # {'window', 'version'} of the snapshot shown; the places stay on the server
     dcc.Store(id='places-store'),
     dcc.Store(id='selected-types-store', data=[]),
     dcc.Store(id='event-window-store', data=EVENT_TIME_WINDOW_DAYS),
     dcc.Store(id='map-bounds-store'), 
     dcc.Store(id='all-types-store', data=[]),
+    dcc.Store(id='search-results-store'),
     dcc.Interval(id='startup-refresh', interval=0, n_intervals=0, max_intervals=1),  
     
     
@@ -118,7 +164,12 @@ app.layout = html.Div([
                         url="https://{s}.basemaps.cartocdn.com/dark_all/{z}/{x}/{y}{r}.png",
                         attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors &copy; <a href="https://carto.com/attributions">CARTO</a>'
                     ),
-                    dl.LayerGroup(id="marker-layer")
+                    # Places in view, loaded from /tiles by assets/place_tiles.js
+                    dl.GeoJSON(
+                        id="marker-layer",
+                        data={'type': 'FeatureCollection', 'features': []},
+                        onEachFeature={'variable': 'placeTiles.bindPopup'}
+                    )
                 ]
             )
         ], style={
@@ -196,9 +247,9 @@ def build_filter_pills(all_types):
     Input({'type': 'filter-pill', 'index': ALL}, 'n_clicks'),
     [State('places-store', 'data'),
      State('selected-types-store', 'data')])
-def update_selected_types(n_clicks_list, resources_data, current_selected):
+def update_selected_types(n_clicks_list, places_info, current_selected):
     import json
-    types = get_places_types(resources_data)
+    types = current_snapshot(places_info).derived('types', build_snapshot_types)
     pill_filters = types + [EVENTS_PILL]
     
     selected_excluding_events = [t for t in current_selected if t != EVENTS_PILL]
@@ -260,8 +311,8 @@ def update_selected_types(n_clicks_list, resources_data, current_selected):
 )
 def init_all_types(n_intervals):
     # Load ALL data without time window filtering to get the complete set of types
-    places_by_id, _ = cached_places_and_events(999)  # Use a large window to get all types
-    return get_places_types([extract_place_info(p) for p in places_by_id.values()])
+    places_by_id, _ = cached_places_and_events(ALL_TYPES_WINDOW_DAYS, start_of_today())
+    return get_places_types(places_by_id.values())
 
 
 # Initialize selection when places arrive and no selection set yet
@@ -271,10 +322,10 @@ def init_all_types(n_intervals):
     State('selected-types-store', 'data'),
     prevent_initial_call=True
 )
-def init_selected_types(resources_data, current_selected):
+def init_selected_types(places_info, current_selected):
     if current_selected:
         return no_update
-    return get_places_types(resources_data)
+    return current_snapshot(places_info).derived('types', build_snapshot_types)
 
 # add this once (you already have Output/Input imported)
 # Debounced clientside callback: writes stable bounds to map-bounds-store
@@ -382,33 +433,171 @@ def update_event_window_pill_styles(selected_window, pill_ids):
             classes.append(base)
     return classes
 
+@metrics.track_cache('places_and_events')
 @cache.memoize()
-def cached_places_and_events(interval_days):
-    # Include today's date in the cache key to ensure freshness
-    import datetime
-    today = datetime.datetime.now().strftime('%Y-%m-%d')
-    
+def cached_places_and_events(interval_days, start_date):
+    # Only runs on a cache miss. start_date is part of the cache key, so the
+    # data is reloaded when the day changes
+    metrics.mark_cache_miss()
     return load_places_and_events(
         AIRTABLE_API_KEY,
         AIRTABLE_BASE_ID,
         AIRTABLE_PLACES_TABLE_ID,
         AIRTABLE_EVENTS_TABLE_ID,
-        interval_days=interval_days,
-        cache_date=today  # Pass as an unused parameter to create a unique cache key
+        start_date=start_date,
+        interval_days=interval_days
+    )
+
+def build_place_list_item(info):
+    type_badges = build_type_badges(info['types'])
+    # Event link(s): show the first event link if present
+    event_links = info.get('events') or []
+    first_event_link = None
+    for e in event_links:
+        if e and e.get('url'):
+            first_event_link = e
+            break
+    return html.Div([
+        html.H4(info['name'], className="resource-item-title"),
+        html.Div(type_badges, className="type-badges") if type_badges else None,
+        (html.A(
+            f"📅 {first_event_link.get('name') or 'Event'}",
+            href=first_event_link.get('url'),
+            target='_blank',
+            className="event-link event-link--small"
+        ) if first_event_link else None),
+        (dcc.Markdown(info['notes'], link_target="_blank", className="notes notes--compact") if info['notes'] else None),
+        (html.A('📍 View on Google Maps', href=info['url'], target='_blank', className="google-maps-link google-maps-link--small") if info['url'] and info['url'] != '#' else None)
+    ], className='resource-item')
+
+def build_rendered_places(snapshot):
+    # Sidebar item of every place, built once per snapshot
+    return {
+        p['id']: build_place_list_item(p)
+        for p in snapshot.places
+        if p['lat'] is not None and p['lon'] is not None
+    }
+
+def is_preset_center(center_lat, center_lon, tolerance=1e-3):
+    """True if the map is centered on the initial view or a preset."""
+    return any(
+        abs(lat - center_lat) <= tolerance and abs(lon - center_lon) <= tolerance
+        for lat, lon in [MAP_CENTER] + [preset['center'] for preset in LOCATION_PRESETS.values()]
+    )
+
+def build_sidebar_cache(snapshot):
+    # (info text, sidebar items) of the initial and preset views, keyed by map bounds
+    return LRUCache(SIDEBAR_CACHE_SIZE)
+
+def build_snapshot_types(snapshot):
+    return get_places_types(snapshot.places)
+
+def warm_snapshot(snapshot):
+    # Precompute first paint and search as soon as new data arrives
+    snapshot.derived('types', build_snapshot_types)
+    snapshot.derived('rendered_places', build_rendered_places)
+    snapshot.derived('search_index', build_search_index)
+
+def load_places_data(interval_days):
+    places_by_id, place_id_to_events = cached_places_and_events(interval_days, start_of_today())
+    # Prepare data for the store
+    return [
+        {**p, 'events': place_id_to_events.get(p['id'], [])}
+        for p in places_by_id.values()
+    ]
+
+# Versioned per-window snapshots; indexes derived from them are built once per version
+snapshots = SnapshotStore(load_places_data, ttl=CACHE_TIMEOUT, warm=warm_snapshot)
+
+def current_snapshot(places_info):
+    """The snapshot of the window in `places-store` (the default window until it is set)."""
+    return snapshots.get((places_info or {}).get('window', EVENT_TIME_WINDOW_DAYS))
+
+# Places as z/x/y tiles for viewport-sized downloads (see services/tiles.py)
+register_tile_routes(
+    app.server, snapshots,
+    windows=[tw["value"] for tw in EVENT_TIME_WINDOWS],
+    default_window=EVENT_TIME_WINDOW_DAYS
+)
+
+def refresh_changed_records(changes):
+    """Patches the cached Airtable data of every window with the changed records only."""
+    start_date = start_of_today()
+    windows = [tw["value"] for tw in EVENT_TIME_WINDOWS] + [ALL_TYPES_WINDOW_DAYS]
+    keys = {
+        window: cached_places_and_events.make_cache_key(
+            cached_places_and_events.uncached, window, start_date
+        )
+        for window in windows
+    }
+    # Windows not loaded yet fetch fresh data on the next request anyway
+    cached = {window: cache.get(key) for window, key in keys.items()}
+    cached = {window: data for window, data in cached.items() if data is not None}
+    if cached:
+        # One fetch for all windows (Airtable allows 5 requests per second)
+        changed_places, changed_events = fetch_record_changes(
+            changes,
+            AIRTABLE_API_KEY,
+            AIRTABLE_BASE_ID,
+            AIRTABLE_PLACES_TABLE_ID,
+            AIRTABLE_EVENTS_TABLE_ID
+        )
+        for window, data in cached.items():
+            updated = apply_record_changes(
+                *data, changes, changed_places, changed_events,
+                AIRTABLE_PLACES_TABLE_ID,
+                AIRTABLE_EVENTS_TABLE_ID,
+                start_date=start_date,
+                interval_days=window
+            )
+            cache.set(keys[window], updated, timeout=CACHE_TIMEOUT)
+    snapshots.invalidate()
+
+def use_short_cache_timeout():
+    """The webhook could not be refreshed: reload the data regularly again."""
+    global CACHE_TIMEOUT
+    CACHE_TIMEOUT = SHORT_CACHE_TIMEOUT
+    # The memoized function sits under the metrics wrapper
+    cached_places_and_events.__wrapped__.cache_timeout = CACHE_TIMEOUT
+    cache.delete_memoized(cached_places_and_events.__wrapped__)
+    snapshots.ttl = CACHE_TIMEOUT
+
+if WEBHOOK_ENABLED:
+    register_webhook_routes(
+        app.server, AIRTABLE_WEBHOOK_SECRET, refresh_changed_records,
+        payload_cursor=PayloadCursor(AIRTABLE_API_KEY, AIRTABLE_BASE_ID, AIRTABLE_WEBHOOK_ID)
     )
+    WebhookRefresher(
+        AIRTABLE_API_KEY, AIRTABLE_BASE_ID, AIRTABLE_WEBHOOK_ID, use_short_cache_timeout
+    ).start()
 
+# Switch to the snapshot of the new interval. Only its window and version go
+# to the browser: callbacks read the places from `snapshots` on the server, so
+# the data is not uploaded again with every pan or pill click
 @app.callback(
     Output('places-store', 'data'),
     [Input('event-window-store', 'data'),
-     Input('startup-refresh', 'n_intervals')]  # <--- Add this input
+     Input('startup-refresh', 'n_intervals')]
 )
-def update_resources_on_time_window_change(selected_window, n_intervals):
-    # Reload places and events with the new interval
-    places_by_id, place_id_to_events = cached_places_and_events(selected_window)
-    # Prepare data for the store
+def update_places_snapshot(selected_window, n_intervals):
+    return {'window': selected_window, 'version': snapshots.get(selected_window).version}
+
+# Typeahead: suggest the best matching place names while typing
+@app.callback(
+    Output('search-suggestions', 'children'),
+    Input('search-input', 'value'),
+    State('event-window-store', 'data'),
+    prevent_initial_call=True
+)
+def update_search_suggestions(search_query, selected_window):
+    if not search_query:
+        return []
+    snapshot = snapshots.get(selected_window)
+    search_index = snapshot.derived('search_index', build_search_index)
     return [
-        {**extract_place_info(p), 'events': place_id_to_events.get(p.get('id'), [])}
-        for p in places_by_id.values()
+        html.Option(value=snapshot.places_by_id[pid]['name'])
+        # None for a query without searchable characters (e.g. "-")
+        for pid in search_index.search(search_query, limit=8) or []
     ]
 
 @app.callback(
@@ -430,25 +619,83 @@ def jump_to_preset_location(n_clicks):
     
     return no_update
 
+# Place ids matching the search box, best match first
+@app.callback(
+    Output('search-results-store', 'data'),
+    [Input('search-input', 'value'),
+     Input('event-window-store', 'data')]
+)
+def update_search_results(search_query, selected_window):
+    if not search_query:
+        return None
+    search_index = snapshots.get(selected_window).derived('search_index', build_search_index)
+    # None as well for a query without searchable characters (e.g. "-")
+    return search_index.search(search_query)
+
+# Markers: the places in view, fetched as cacheable tiles by the browser
+# (see services/tiles.py and assets/place_tiles.js)
+app.clientside_callback(
+    """
+    function(bounds, selected_types, search_results, places, zoom, all_types) {
+        // places only triggers a reload when the data (and tile version) changes
+        return window.placeTiles.load('%s', bounds, zoom, places, {
+            selectedTypes: selected_types,
+            allTypes: all_types,
+            searchResults: search_results,
+            eventsPill: %s
+        });
+    }
+    """ % (app.get_relative_path('/tiles'), json.dumps(EVENTS_PILL)),
+    Output('marker-layer', 'data'),
+    [Input('map-bounds-store', 'data'),
+     Input('selected-types-store', 'data'),
+     Input('search-results-store', 'data'),
+     Input('places-store', 'data')],
+    [State('main-map', 'zoom'),
+     State('all-types-store', 'data')]
+)
+
 @app.callback(
-    [Output('marker-layer', 'children'),
-     Output('results-info', 'children'),
+    [Output('results-info', 'children'),
      Output('resource-list', 'children')],
     [Input('selected-types-store', 'data'),
      Input('map-bounds-store', 'data'),
-     Input('places-store', 'data')]
+     Input('places-store', 'data'),
+     Input('search-results-store', 'data')]
 )
-def update_markers_info_and_list(selected_types, bounds, places_data):
+def update_info_and_list(selected_types, bounds, places_info, search_results):
+    snapshot = current_snapshot(places_info)
+    center_lat, center_lon = get_center_from_map_bounds(bounds, MAP_CENTER)
+
+    # The initial view and preset jumps under the default filters are the same
+    # for everyone with the same map size, so they are built once per snapshot
+    all_types_selected = not selected_types or set(
+        snapshot.derived('types', build_snapshot_types)
+    ) <= set(selected_types)
+    if (search_results is None and EVENTS_PILL not in selected_types and all_types_selected
+            and is_preset_center(center_lat, center_lon)):
+        return snapshot.derived('sidebar_cache', build_sidebar_cache).get_or_build(
+            json.dumps(bounds),
+            lambda: build_info_and_list(snapshot, selected_types, bounds, search_results)
+        )
+    return build_info_and_list(snapshot, selected_types, bounds, search_results)
+
+def build_info_and_list(snapshot, selected_types, bounds, search_results):
     # center coordinates for sorting places
     center_lat, center_lon = get_center_from_map_bounds(bounds, MAP_CENTER)
+
+    # Search results as {place id: rank}; None when not searching
+    search_rank = None if search_results is None else {pid: i for i, pid in enumerate(search_results)}
     
     # selected_types here receives the places types AND the 'Only Places with Events' filter
-    places_data = places_data or []
     # Build list of resources that match selected types and have valid coordinates
     fiiltered_places = []
-    for info in places_data:
+    for info in snapshot.places:
         if info['lat'] is None or info['lon'] is None:
             continue
+
+        if search_rank is not None and info['id'] not in search_rank:
+            continue
         
         # If there are selected types, ensure intersection
         if selected_types and info['types']:
@@ -461,20 +708,8 @@ def update_markers_info_and_list(selected_types, bounds, places_data):
         
         fiiltered_places.append(info)
 
-    # Markers: show all filtered markers (not limited by view bounds)
-    markers = [
-        dl.Marker(
-            position=[info['lat'], info['lon']],
-            children=dl.Popup(
-                build_popup_content(
-                    info['name'], info['types'], info['notes'], info['url'], info.get('events')
-                ),
-                maxWidth=350,
-                autoPanPadding=[70, 70]
-            )
-        )
-        for info in fiiltered_places
-    ]
+    # Sidebar items are prebuilt per snapshot
+    rendered = snapshot.derived('rendered_places', build_rendered_places)
 
     # Sidebar list: only items within current view bounds
     visible_places = [
@@ -482,40 +717,20 @@ def update_markers_info_and_list(selected_types, bounds, places_data):
         if is_within_bounds(info['lat'], info['lon'], bounds)
     ]
     
-    # sort by distance too the center
-    visible_places.sort(key=lambda place: rough_distance(center_lat, center_lon, place['lat'], place['lon']))
-
-    places_list_items = []
-    for info in visible_places:
-        type_badges = build_type_badges(info['types'])
-        # Event link(s): show the first event link if present
-        event_links = info.get('events') or []
-        first_event_link = None
-        for e in event_links:
-            if e and e.get('url'):
-                first_event_link = e
-                break
-        places_list_items.append(
-            html.Div([
-                html.H4(info['name'], className="resource-item-title"),
-                html.Div(type_badges, className="type-badges") if type_badges else None,
-                (html.A(
-                    f"📅 {first_event_link.get('name') or 'Event'}",
-                    href=first_event_link.get('url'),
-                    target='_blank',
-                    className="event-link event-link--small"
-                ) if first_event_link else None),
-                (dcc.Markdown(info['notes'], link_target="_blank", className="notes notes--compact") if info['notes'] else None),
-                (html.A('📍 View on Google Maps', href=info['url'], target='_blank', className="google-maps-link google-maps-link--small") if info['url'] and info['url'] != '#' else None)
-            ], className='resource-item')
-        )
+    # sort by search relevance when searching, otherwise by distance too the center
+    if search_rank is not None:
+        visible_places.sort(key=lambda place: search_rank[place['id']])
+    else:
+        visible_places.sort(key=lambda place: rough_distance(center_lat, center_lon, place['lat'], place['lon']))
+
+    places_list_items = [rendered[info['id']] for info in visible_places]
 
     # Info text
     filtered_count = len(fiiltered_places)
     visible_count = len(visible_places)
     info_text = f"Showing {visible_count}/{filtered_count} locations on the map"
 
-    return markers, info_text, places_list_items
+    return info_text, places_list_items
 
 if __name__ == '__main__':
     import os
@@ -0,0 +1,92 @@
+// Popup content of a place, shared by the tiled markers (assets/place_tiles.js)
+// and the static site (services/static_site/map.js, copied by build_static.py).
+(function () {
+    'use strict';
+
+    function el(tag, className, text) {
+        const node = document.createElement(tag);
+        if (className) node.className = className;
+        if (text !== undefined && text !== null) node.textContent = text;
+        return node;
+    }
+
+    function link(text, href, className) {
+        const node = el('a', className, text);
+        node.href = href;
+        node.target = '_blank';
+        return node;
+    }
+
+    function escapeHtml(text) {
+        return text.replace(/[&<>"']/g, (c) => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c]));
+    }
+
+    /*
+     * In the Dash app notes go through the same dcc.Markdown component as the
+     * sidebar. The static site has no Dash, so it uses a small, safe subset of
+     * Markdown (links, bold, italics, line breaks) for its popups and sidebar.
+     */
+    function renderNotes(notes, className) {
+        const dcc = window.dash_core_components;
+        if (dcc && window.React && window.ReactDOM) {
+            const node = el('div');
+            const root = window.ReactDOM.createRoot(node);
+            window.ReactDOM.flushSync(() => root.render(window.React.createElement(
+                dcc.Markdown, {children: notes, link_target: '_blank', className: className}
+            )));
+            return node;
+        }
+        const node = el('div', className);
+        node.innerHTML = escapeHtml(notes)
+            .replace(/\[([^\]]+)\]\((https?:\/\/[^\s)]+)\)/g, '<a href="$2" target="_blank">$1</a>')
+            .replace(/\*\*([^*]+)\*\*/g, '<strong>$1</strong>')
+            .replace(/\*([^*]+)\*/g, '<em>$1</em>')
+            .replace(/\n/g, '<br>');
+        return node;
+    }
+
+    function typeBadges(types) {
+        const badges = el('div', 'type-badges');
+        types.forEach((t) => badges.appendChild(el('span', 'type-badge', t)));
+        return badges;
+    }
+
+    // First event with a link, as in build_place_list_item in app.py
+    function firstEvent(place) {
+        return (place.events || []).find((e) => e && e.url) || null;
+    }
+
+    function eventLink(event, className) {
+        return link('📅 ' + (event.name || 'Event'), event.url, className);
+    }
+
+    function mapsLink(place, className) {
+        // Missing links are '#' in the app and empty in the static site
+        return place.url && place.url !== '#' ? link('📍 View on Google Maps', place.url, className) : null;
+    }
+
+    function popupContent(place) {
+        const content = el('div', 'popup-content');
+        content.appendChild(el('h4', 'popup-title', place.name));
+        if (place.types && place.types.length) content.appendChild(typeBadges(place.types));
+        const notes = el('div', 'notes-wrapper');
+        if (place.notes) notes.appendChild(renderNotes(place.notes, 'notes'));
+        content.appendChild(notes);
+        const event = firstEvent(place);
+        if (event) content.appendChild(eventLink(event, 'event-link'));
+        const maps = mapsLink(place, 'google-maps-link');
+        if (maps) content.appendChild(maps);
+        return content;
+    }
+
+    window.placePopup = {
+        el: el,
+        renderNotes: renderNotes,
+        typeBadges: typeBadges,
+        firstEvent: firstEvent,
+        eventLink: eventLink,
+        mapsLink: mapsLink,
+        content: popupContent,
+        options: {maxWidth: 350, autoPanPadding: [70, 70]},
+    };
+})();
@@ -0,0 +1,76 @@
+// Markers of the places in view, loaded as z/x/y tiles from the server (see
+// services/tiles.py) instead of going through a Python callback on every pan.
+// Used by the `marker-layer` GeoJSON component in app.py.
+(function () {
+    'use strict';
+
+    const MAX_TILE_ZOOM = 18;
+    let latestLoad = 0;
+
+    // {x: [min, max], y: [min, max]} of the tiles covering Leaflet `bounds` at `z`
+    function tileRange(bounds, z) {
+        const n = Math.pow(2, z);
+        const clamp = (v) => Math.min(Math.max(v, 0), n - 1);
+        const tileX = (lon) => clamp(Math.floor((lon + 180) / 360 * n));
+        const tileY = (lat) => {
+            const rad = Math.max(Math.min(lat, 85.0511), -85.0511) * Math.PI / 180;
+            return clamp(Math.floor((1 - Math.log(Math.tan(rad) + 1 / Math.cos(rad)) / Math.PI) / 2 * n));
+        };
+        const [[south, west], [north, east]] = bounds;
+        return {x: [tileX(west), tileX(east)], y: [tileY(north), tileY(south)]};
+    }
+
+    function fetchJson(url) {
+        return fetch(url).then((r) => {
+            if (!r.ok) throw new Error(url + ': ' + r.status);
+            return r.json();
+        });
+    }
+
+    /*
+     * Resolves to a FeatureCollection of the places in view that pass the
+     * filters of update_info_and_list: types are filtered by the server,
+     * events and search here. `places` is the places-store of app.py.
+     */
+    function load(prefix, bounds, zoom, places, filters) {
+        const noUpdate = window.dash_clientside.no_update;
+        if (!bounds || !places) return noUpdate;
+        const loadId = ++latestLoad;
+
+        const selected = (filters.selectedTypes || []).filter((t) => t !== filters.eventsPill);
+        const allSelected = (filters.allTypes || []).every((t) => selected.includes(t));
+        // The version makes every tile URL immutable, so the browser only
+        // downloads tiles it has not seen for this snapshot
+        const params = new URLSearchParams({window: places.window, v: places.version});
+        if (selected.length && !allSelected) selected.slice().sort().forEach((t) => params.append('types', t));
+        const z = Math.min(Math.max(Math.floor(zoom || 0), 0), MAX_TILE_ZOOM);
+        const range = tileRange(bounds, z);
+
+        const requests = [];
+        for (let x = range.x[0]; x <= range.x[1]; x++) {
+            for (let y = range.y[0]; y <= range.y[1]; y++) {
+                requests.push(fetchJson(`${prefix}/${z}/${x}/${y}.geojson?${params}`));
+            }
+        }
+        return Promise.all(requests).then((tiles) => {
+            // A later pan or filter change already started its own load
+            if (loadId !== latestLoad) return noUpdate;
+            const onlyEvents = (filters.selectedTypes || []).includes(filters.eventsPill);
+            const searchIds = filters.searchResults ? new Set(filters.searchResults) : null;
+            const features = [].concat(...tiles.map((t) => t.features)).filter((f) =>
+                (!onlyEvents || f.properties.events.length)
+                && (!searchIds || searchIds.has(f.properties.id)));
+            return {type: 'FeatureCollection', features: features};
+        }).catch((err) => {
+            console.error(err);
+            return noUpdate;
+        });
+    }
+
+    function bindPopup(feature, layer) {
+        // assets/place_popup.js
+        layer.bindPopup(() => window.placePopup.content(feature.properties), window.placePopup.options);
+    }
+
+    window.placeTiles = {load: load, bindPopup: bindPopup};
+})();
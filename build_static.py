@@ -0,0 +1,128 @@
+"""
+Static export of the map.
+
+Runs the loader once and writes a site that needs no Python at request time:
+the page in `services/static_site` does all filtering in the browser, and the
+data is written as versioned files that can be cached forever.
+
+    python build_static.py --out dist
+
+Output:
+    index.html, map.js, place_popup.js, styles.css
+    manifest.json                  current version + paths (serve with a short max-age)
+    data/<version>/places-<n>.json places and their events for each event window
+    data/<version>/types.json      all place types
+    data/<version>/views.json      initial view (center and zoom) and one view per
+                                   LOCATION_PRESETS entry (center only: presets keep the
+                                   zoom, as in the app), each with the place ids ordered
+                                   by distance to its center
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+from app import (
+    ALL_TYPES_WINDOW_DAYS, EVENT_TIME_WINDOW_DAYS, EVENT_TIME_WINDOWS, EVENTS_PILL,
+    LOCATION_PRESETS, MAP_CENTER, load_places_data
+)
+from config.helpers import get_places_types, rough_distance
+
+STATIC_SITE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'services', 'static_site')
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+INITIAL_ZOOM = 12
+
+
+def compact_place(place):
+    """Keeps only what the browser renders; '#' placeholder URLs become empty."""
+    return {
+        'id': place['id'],
+        'name': place['name'],
+        'types': place['types'],
+        'lat': place['lat'],
+        'lon': place['lon'],
+        'notes': place['notes'],
+        'url': place['url'] if place['url'] != '#' else '',
+        # Only the first event with a link is shown
+        'events': [
+            {'name': e.get('name'), 'url': e.get('url')}
+            for e in (place.get('events') or []) if e and e.get('url')
+        ][:1],
+    }
+
+
+def build_view(places, center):
+    """
+    Ids of all located places ordered by distance to the center of a view.
+    The visible part depends on the screen size, so the browser keeps the
+    ones within its actual map bounds.
+    """
+    located = [p for p in places if p['lat'] is not None and p['lon'] is not None]
+    located.sort(key=lambda p: rough_distance(center[0], center[1], p['lat'], p['lon']))
+    return {'center': center, 'ids': [p['id'] for p in located]}
+
+
+def dump(obj):
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8')
+
+
+def build(out_dir):
+    files = {}
+    for tw in EVENT_TIME_WINDOWS:
+        places = [compact_place(p) for p in load_places_data(tw['value'])]
+        files[f"places-{tw['value']}.json"] = dump(places)
+
+    files['types.json'] = dump(get_places_types(load_places_data(ALL_TYPES_WINDOW_DAYS)))
+
+    default_places = load_places_data(EVENT_TIME_WINDOW_DAYS)
+    files['views.json'] = dump({
+        'initial': {**build_view(default_places, MAP_CENTER), 'zoom': INITIAL_ZOOM},
+        'presets': {
+            name: build_view(default_places, preset['center'])
+            for name, preset in LOCATION_PRESETS.items()
+        },
+    })
+
+    # The version changes whenever any of the data changes
+    digest = hashlib.sha1()
+    for name in sorted(files):
+        digest.update(name.encode('utf-8'))
+        digest.update(files[name])
+    version = digest.hexdigest()[:12]
+
+    data_dir = os.path.join(out_dir, 'data', version)
+    os.makedirs(data_dir, exist_ok=True)
+    for name, content in files.items():
+        with open(os.path.join(data_dir, name), 'wb') as f:
+            f.write(content)
+
+    prefix = f"data/{version}/"
+    manifest = {
+        'version': version,
+        'events_pill': EVENTS_PILL,
+        'default_window': EVENT_TIME_WINDOW_DAYS,
+        'windows': [
+            {'label': tw['label'], 'value': tw['value'], 'places': f"{prefix}places-{tw['value']}.json"}
+            for tw in EVENT_TIME_WINDOWS
+        ],
+        'types': f"{prefix}types.json",
+        'views': f"{prefix}views.json",
+    }
+    with open(os.path.join(out_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.copy(os.path.join(STATIC_SITE_DIR, 'index.html'), out_dir)
+    shutil.copy(os.path.join(STATIC_SITE_DIR, 'map.js'), out_dir)
+    shutil.copy(os.path.join(ASSETS_DIR, 'place_popup.js'), out_dir)
+    shutil.copy(os.path.join(ASSETS_DIR, 'styles.css'), out_dir)
+    return version
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the static version of the map.")
+    parser.add_argument('--out', default='dist', help="Output directory")
+    args = parser.parse_args()
+
+    version = build(args.out)
+    print(f"Static site written to {args.out} (data version {version})")
@@ -1,5 +1,5 @@
 from config.schema import PLACES_SCHEMA
-from dash import html, dcc
+from dash import html
 
 # Helper: normalize/coerce values by type (based on the data type specified on the schema)
 def coerce_value(value, type_decl):
@@ -48,39 +48,6 @@ def build_type_badges(types):
     return badges
 
 
-def build_popup_content(name, types, notes, url, events=None):
-    type_badges = build_type_badges(types)
-    # Pick first event if available
-    first_event = None
-    for e in (events or []):
-        if e and e.get('url'):
-            first_event = e
-            break
-    return html.Div([
-        html.Div([
-            html.H4(name, className="popup-title"),
-            html.Div(type_badges, className="type-badges") if type_badges else None,
-            html.Div(
-                dcc.Markdown(notes, link_target="_blank", className="notes") if notes else \
-                None,
-                className="notes-wrapper"
-            ),
-            (html.A(
-                f"📅 {first_event.get('name') or 'Event'}",
-                href=first_event.get('url'),
-                target='_blank',
-                className="event-link"
-            ) if first_event else None),
-            html.A(
-                '📍 View on Google Maps',
-                href=url,
-                target='_blank',
-                className="google-maps-link"
-            ) if url != '#' else None
-        ], className="popup-content")
-    ])
-
-
 def extract_place_info(r):
     """
     Args:
@@ -175,3 +142,26 @@ def rough_distance(lat1, lon1, lat2, lon2):
     lat_diff = lat2 - lat1
     lon_diff = (lon2 - lon1) * cos(radians(lat1))
     return lat_diff**2 + lon_diff**2  # no sqrt, still valid for sorting
+
+# Approximate the map bounds for a center/zoom (used when there is no browser to ask)
+def get_bounds_for_view(center, zoom, width_px=800, height_px=600):
+    """
+    Computes the bounds a Web Mercator map of `width_px` x `height_px` pixels
+    shows at `center` and `zoom`.
+
+    Returns:
+        list: [[south, west], [north, east]], the format of the Leaflet `bounds` property.
+    """
+    from math import atan, cos, degrees, log, pi, radians, sinh, tan
+    world_px = 256 * 2 ** zoom
+    lat, lon = center
+    # Project the center to world pixels, offset by half the viewport, project back
+    x = (lon + 180) / 360 * world_px
+    y = (1 - log(tan(radians(lat)) + 1 / cos(radians(lat))) / pi) / 2 * world_px
+
+    def to_lat_lon(px, py):
+        return degrees(atan(sinh(pi * (1 - 2 * py / world_px)))), px / world_px * 360 - 180
+
+    north, west = to_lat_lon(x - width_px / 2, y - height_px / 2)
+    south, east = to_lat_lon(x + width_px / 2, y + height_px / 2)
+    return [[south, west], [north, east]]
@@ -0,0 +1,382 @@
+"""
+Load test: concurrent simulated users replaying realistic sessions over HTTP.
+
+By default the app is started in this process (one threaded Werkzeug
+server, i.e. one worker) on generated data from the Airtable stand-in, so
+no credentials or network are needed:
+
+    python loadtest.py --users 20 --duration 60
+
+Use --url to target an already running app instead (e.g. behind gunicorn).
+
+Each user starts like a browser (page, layout, dependencies, startup
+callbacks) and then keeps picking actions with the given
+weights: pans with varying bounds and zoom, type pill toggles, location
+preset clicks, event window changes and searches. Requests are built the
+way the Dash renderer builds them, with the inputs and states the browser
+would hold. Map tiles
+are fetched for each new view, skipping the ones the browser would already
+have cached.
+
+The report lists throughput, latency percentiles and errors per callback
+and per GET endpoint.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+from config.helpers import get_bounds_for_view
+from services.tiles import MAX_ZOOM, tile_for
+
+ACTION_WEIGHTS = {'pan': 40, 'pill': 25, 'preset': 15, 'window': 10, 'search': 10}
+VIEWPORT = (1024, 700)
+SEARCH_TERMS = ['coffee', 'lab', 'hub studio', 'found', 'king', 'maker', 'commons w']
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, ok):
+        with self._lock:
+            self.latencies[name].append(seconds)
+            if not ok:
+                self.errors[name] += 1
+
+    def report(self, elapsed, users):
+        def percentile(values, q):
+            return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+        total = sum(len(v) for v in self.latencies.values())
+        errors = sum(self.errors.values())
+        lines = [
+            f"{users} users, {elapsed:.1f}s, {total} requests ({total / elapsed:.1f} req/s), {errors} errors",
+            '',
+            f"{'name':<36}{'count':>8}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}",
+        ]
+        for name in sorted(self.latencies, key=lambda n: -len(self.latencies[n])):
+            values = sorted(self.latencies[name])
+            lines.append(
+                f"{name:<36}{len(values):>8}{self.errors[name]:>8}{len(values) / elapsed:>9.1f}"
+                f"{percentile(values, 0.5):>9.1f}{percentile(values, 0.9):>9.1f}"
+                f"{percentile(values, 0.99):>9.1f}{values[-1] * 1000:>9.1f}"
+            )
+        return '\n'.join(lines)
+
+
+def stringify_id(component_id):
+    # Same as the Dash renderer: pattern-matching ids are JSON with sorted keys
+    if isinstance(component_id, dict):
+        return json.dumps(component_id, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return component_id
+
+
+def parse_outputs(output_key):
+    """Turns a callback_map key into the `outputs` spec of a request."""
+    multi = output_key.startswith('..')
+    parts = output_key[2:-2].split('...') if multi else [output_key]
+    specs = []
+    for part in parts:
+        component_id, prop = part.rsplit('.', 1)
+        if component_id.startswith('{'):
+            component_id = json.loads(component_id)
+        specs.append({'id': component_id, 'property': prop})
+    return specs if multi else specs[0]
+
+
+def prop(component_id, prop_name, value):
+    return {'id': component_id, 'property': prop_name, 'value': value}
+
+
+class Session:
+    """One simulated user; mirrors the state the browser would hold."""
+
+    def __init__(self, base_url, callbacks, config, stats, rng, think_time):
+        self.base_url = base_url.rstrip('/')
+        self.callbacks = callbacks
+        self.config = config
+        self.stats = stats
+        self.rng = rng
+        self.think_time = think_time
+        self.http = requests.Session()
+
+        self.window = config['default_window']
+        self.types = []
+        self.selected = []
+        self.places_info = None
+        self.center = list(config['map_center'])
+        self.zoom = 12
+        self.search = ''
+        self.search_results = None
+        # Versioned tile URLs are immutable, so the browser fetches each once
+        self.seen_tiles = set()
+        self.pill_clicks = defaultdict(int)
+        self.preset_clicks = defaultdict(int)
+        self.window_clicks = defaultdict(int)
+
+    # --- HTTP ---
+
+    def get(self, path, name=None, headers=None, **params):
+        start = time.perf_counter()
+        try:
+            response = self.http.get(self.base_url + path, params=params, headers=headers, timeout=60)
+            ok = response.status_code in (200, 304)
+        except requests.RequestException:
+            response, ok = None, False
+        self.stats.record(name or f"GET {path}", time.perf_counter() - start, ok)
+        return response if ok else None
+
+    def callback(self, name, inputs, state=(), changed=()):
+        output_key = self.callbacks[name]
+        body = {
+            'output': output_key,
+            'outputs': parse_outputs(output_key),
+            'inputs': list(inputs),
+            'state': list(state),
+            'changedPropIds': list(changed),
+        }
+        start = time.perf_counter()
+        try:
+            response = self.http.post(
+                self.base_url + '/_dash-update-component', json=body, timeout=60
+            )
+            # 204 is a PreventUpdate, which is a valid answer
+            ok = response.status_code in (200, 204)
+        except requests.RequestException:
+            response, ok = None, False
+        self.stats.record(name, time.perf_counter() - start, ok)
+        if not ok or response.status_code == 204:
+            return {}
+        return response.json().get('response', {})
+
+    # --- Building blocks ---
+
+    def bounds(self):
+        return get_bounds_for_view(self.center, self.zoom, *VIEWPORT)
+
+    def load_places(self):
+        result = self.callback('update_places_snapshot', [
+            prop('event-window-store', 'data', self.window),
+            prop('startup-refresh', 'n_intervals', 1),
+        ])
+        self.places_info = result.get('places-store', {}).get('data', self.places_info)
+
+    def search_places(self):
+        result = self.callback('update_search_results', [
+            prop('search-input', 'value', self.search),
+            prop('event-window-store', 'data', self.window),
+        ])
+        self.search_results = result.get('search-results-store', {}).get('data')
+
+    def load_tiles(self):
+        # Same requests as assets/place_tiles.js
+        if not self.places_info:
+            return
+        params = {'window': self.places_info['window'], 'v': self.places_info['version']}
+        selected = [t for t in self.selected if t != self.config['events_pill']]
+        if selected and not set(self.types) <= set(selected):
+            params['types'] = tuple(sorted(selected))
+        z = min(self.zoom, MAX_ZOOM)
+        (south, west), (north, east) = self.bounds()
+        (x_min, y_min), (x_max, y_max) = tile_for(north, west, z), tile_for(south, east, z)
+        for x in range(x_min, x_max + 1):
+            for y in range(y_min, y_max + 1):
+                key = (z, x, y, tuple(sorted(params.items())))
+                if key not in self.seen_tiles:
+                    self.get(f"/tiles/{z}/{x}/{y}.geojson", name='GET /tiles', **params)
+                    self.seen_tiles.add(key)
+
+    def update_view(self):
+        self.load_tiles()
+        self.callback('update_info_and_list', [
+            prop('selected-types-store', 'data', self.selected),
+            prop('map-bounds-store', 'data', self.bounds()),
+            prop('places-store', 'data', self.places_info),
+            prop('search-results-store', 'data', self.search_results),
+        ])
+
+    def pill_inputs(self):
+        return [[
+            prop({'index': t, 'type': 'filter-pill'}, 'n_clicks', self.pill_clicks[t])
+            for t in self.types + [self.config['events_pill']]
+        ]]
+
+    def select_types(self, changed=()):
+        result = self.callback('update_selected_types', self.pill_inputs(), state=[
+            prop('places-store', 'data', self.places_info),
+            prop('selected-types-store', 'data', self.selected),
+        ], changed=changed)
+        self.selected = result.get('selected-types-store', {}).get('data', self.selected)
+
+    # --- Session ---
+
+    def startup(self):
+        self.get('/', name='GET /')
+        self.get('/_dash-layout')
+        self.get('/_dash-dependencies')
+        result = self.callback('init_all_types', [prop('startup-refresh', 'n_intervals', 1)])
+        self.types = result.get('all-types-store', {}).get('data', [])
+        self.load_places()
+        self.callback('build_filter_pills', [prop('all-types-store', 'data', self.types)])
+        self.select_types()
+        self.search_places()
+        self.update_view()
+
+    def pan(self):
+        self.zoom = max(10, min(16, self.zoom + self.rng.choice([-1, 0, 0, 1])))
+        step = 0.3 / 2 ** (self.zoom - 10)
+        self.center = [self.center[0] + self.rng.uniform(-step, step),
+                       self.center[1] + self.rng.uniform(-step, step)]
+        self.update_view()
+
+    def pill(self):
+        choices = self.types + [self.config['events_pill']]
+        if not choices:
+            return
+        clicked = self.rng.choice(choices)
+        self.pill_clicks[clicked] += 1
+        self.select_types(changed=[stringify_id({'index': clicked, 'type': 'filter-pill'}) + '.n_clicks'])
+        self.callback('toggle_event_window_group', [prop('selected-types-store', 'data', self.selected)])
+        self.update_view()
+
+    def preset(self):
+        name = self.rng.choice(list(self.config['presets']))
+        self.preset_clicks[name] += 1
+        result = self.callback('jump_to_preset_location', [[
+            prop({'index': p, 'type': 'location-preset'}, 'n_clicks', self.preset_clicks[p] or None)
+            for p in self.config['presets']
+        ]], changed=[stringify_id({'index': name, 'type': 'location-preset'}) + '.n_clicks'])
+        self.center = result.get('main-map', {}).get('center', self.center)
+        self.update_view()
+
+    def change_window(self):
+        value = self.rng.choice(self.config['windows'])
+        self.window_clicks[value] += 1
+        pill_ids = [{'index': w, 'type': 'event-window-pill'} for w in self.config['windows']]
+        result = self.callback('refresh_event_time_window', [[
+            prop(pid, 'n_clicks', self.window_clicks[pid['index']]) for pid in pill_ids
+        ]], state=[
+            [prop(pid, 'id', pid) for pid in pill_ids],
+            prop('event-window-store', 'data', self.window),
+        ], changed=[stringify_id({'index': value, 'type': 'event-window-pill'}) + '.n_clicks'])
+        self.window = result.get('event-window-store', {}).get('data', self.window)
+        self.load_places()
+        self.search_places()
+        self.update_view()
+
+    def do_search(self):
+        term = self.rng.choice(SEARCH_TERMS + [''])
+        # Typing: suggestions for a couple of prefixes, then the filter update
+        for end in sorted({max(1, len(term) // 2), len(term)}):
+            if term:
+                self.callback('update_search_suggestions', [prop('search-input', 'value', term[:end])],
+                              state=[prop('event-window-store', 'data', self.window)])
+        self.search = term
+        self.search_places()
+        self.update_view()
+
+    def run(self, deadline):
+        self.startup()
+        actions = {
+            'pan': self.pan, 'pill': self.pill, 'preset': self.preset,
+            'window': self.change_window, 'search': self.do_search,
+        }
+        names = list(ACTION_WEIGHTS)
+        weights = [ACTION_WEIGHTS[n] for n in names]
+        while time.monotonic() < deadline:
+            action = self.rng.choices(names, weights)[0]
+            try:
+                actions[action]()
+            except Exception:
+                # e.g. a malformed response; count it and keep the user going
+                self.stats.record(f"session error ({action})", 0.0, False)
+            if self.think_time:
+                time.sleep(self.rng.uniform(0, 2 * self.think_time))
+
+
+def start_local_app(n_places, n_events, port):
+    """Starts the app in a background thread on the Airtable stand-in."""
+    from services import airtable_standin
+
+    places_table_id, events_table_id = airtable_standin.install(n_places, n_events)
+    # Must be set before app.py reads them; real credentials are never used
+    os.environ['AIRTABLE_API_KEY'] = 'standin'
+    os.environ['AIRTABLE_BASE_ID'] = 'standin'
+    os.environ['AIRTABLE_PLACES_TABLE_ID'] = places_table_id
+    os.environ['AIRTABLE_EVENTS_TABLE_ID'] = events_table_id
+
+    from werkzeug.serving import make_server
+    import app as dash_app
+
+    # One log line per request would drown the report
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    server = make_server('127.0.0.1', port, dash_app.app.server, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return dash_app, f"http://127.0.0.1:{server.server_port}"
+
+
+def app_config(dash_app):
+    callbacks = {}
+    for output_key, cb in dash_app.app.callback_map.items():
+        name = getattr(cb.get('callback'), '__name__', None)
+        if name:
+            callbacks[name] = output_key
+    config = {
+        'default_window': dash_app.EVENT_TIME_WINDOW_DAYS,
+        'windows': [tw['value'] for tw in dash_app.EVENT_TIME_WINDOWS],
+        'presets': list(dash_app.LOCATION_PRESETS),
+        'map_center': dash_app.MAP_CENTER,
+        'events_pill': dash_app.EVENTS_PILL,
+    }
+    return callbacks, config
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test the map with concurrent simulated users.")
+    parser.add_argument('--users', type=int, default=10, help="Concurrent users")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds to run")
+    parser.add_argument('--think-time', type=float, default=0.5,
+                        help="Mean pause between a user's actions, in seconds (0 for none)")
+    parser.add_argument('--url', help="Target a running app instead of starting one on the stand-in data")
+    parser.add_argument('--places', type=int, default=500, help="Stand-in places")
+    parser.add_argument('--events', type=int, default=200, help="Stand-in events")
+    parser.add_argument('--port', type=int, default=0, help="Port of the in-process app (0: any free port)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.url:
+        # Callback names/ids are taken from the local code, which must match the target
+        os.environ.setdefault('AIRTABLE_API_KEY', 'unused')
+        os.environ.setdefault('AIRTABLE_BASE_ID', 'unused')
+        os.environ.setdefault('AIRTABLE_PLACES_TABLE_ID', 'unused')
+        os.environ.setdefault('AIRTABLE_EVENTS_TABLE_ID', 'unused')
+        import app as dash_app
+        base_url = args.url
+    else:
+        dash_app, base_url = start_local_app(args.places, args.events, args.port)
+    callbacks, config = app_config(dash_app)
+
+    stats = Stats()
+    start = time.monotonic()
+    deadline = start + args.duration
+    users = [
+        Session(base_url, callbacks, config, stats, random.Random(args.seed + i), args.think_time)
+        for i in range(args.users)
+    ]
+    threads = [threading.Thread(target=user.run, args=(deadline,), daemon=True) for user in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(stats.report(time.monotonic() - start, args.users))
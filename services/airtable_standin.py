@@ -0,0 +1,101 @@
+"""
+Local stand-in for the Airtable tables, for load tests and offline runs.
+
+`install()` generates reproducible, Airtable-shaped place and event records
+and swaps the `Table` class used by `services.data_loader` for one that
+serves them, so the whole loader (paging, coercion, event linking and
+webhook record refreshes) runs unchanged without network access.
+"""
+import random
+import re
+from datetime import datetime, timedelta
+
+import services.data_loader
+
+PLACES_TABLE_ID = 'tblStandInPlaces'
+EVENTS_TABLE_ID = 'tblStandInEvents'
+PAGE_SIZE = 100  # same as the Airtable API
+
+PLACE_TYPES = [
+    'Coffee shop', 'Coworking', 'Library', 'Incubator', 'Accelerator',
+    'Community space', 'Makerspace', 'University', 'Bar', 'Restaurant',
+]
+# Cluster places around the areas people actually look at
+CLUSTERS = [
+    (43.65, -79.38, 0.03), (43.77, -79.41, 0.03), (43.57, -79.64, 0.04),
+    (43.47, -80.54, 0.03), (43.77, -79.25, 0.04), (43.70, -79.40, 0.08),
+]
+WORDS = [
+    'north', 'maple', 'founders', 'builders', 'loft', 'hub', 'studio', 'garage',
+    'harbour', 'king', 'queen', 'spadina', 'bloor', 'lab', 'collective', 'house',
+    'bean', 'roastery', 'yard', 'works', 'commons', 'atrium', 'station', 'union',
+]
+
+
+class StandInTable:
+    """Drop-in for `pyairtable.Table` as used by the loader."""
+
+    records = {}
+
+    def __init__(self, api_key, base_id, table_id):
+        self.table_id = table_id
+
+    def iterate(self, formula=None, **options):
+        records = self.records.get(self.table_id, [])
+        if formula:
+            # Only the RECORD_ID() filter built by `fetch_records_by_id` is supported
+            wanted = set(re.findall(r"RECORD_ID\(\)='([^']+)'", formula))
+            records = [r for r in records if r['id'] in wanted]
+        for i in range(0, len(records), PAGE_SIZE):
+            yield records[i:i + PAGE_SIZE]
+
+    def all(self, **options):
+        return [r for page in self.iterate(**options) for r in page]
+
+
+def generate_records(n_places=500, n_events=200, seed=0):
+    """Returns (places, events) as lists of Airtable-shaped records."""
+    rng = random.Random(seed)
+    places = []
+    for i in range(n_places):
+        lat, lon, spread = rng.choice(CLUSTERS)
+        name = ' '.join(w.capitalize() for w in rng.sample(WORDS, rng.randint(1, 3)))
+        notes = ' '.join(rng.choices(WORDS, k=rng.randint(0, 40)))
+        places.append({
+            'id': f"recPlace{i:06d}",
+            'fields': {
+                'Name': f"{name} {i}",
+                'Type': rng.sample(PLACE_TYPES, rng.randint(1, 3)),
+                'Latitude': round(rng.gauss(lat, spread), 6),
+                'Longitude': round(rng.gauss(lon, spread), 6),
+                'Notes': f"**{notes[:20]}** {notes}" if notes else '',
+                'Google Maps link': f"https://maps.google.com/?q={lat},{lon}",
+            },
+        })
+
+    today = datetime.today()
+    events = []
+    for i in range(n_events):
+        place = rng.choice(places)
+        fields = {
+            'Name': f"{rng.choice(WORDS).capitalize()} meetup {i}",
+            'Place': [place['id']],
+            'Official Link': f"https://example.com/events/{i}",
+        }
+        if rng.random() < 0.5:
+            fields['Recurrence'] = 'Once'
+            date = today + timedelta(days=rng.randint(0, 45), hours=rng.randint(0, 23))
+            fields['Date (if not recurrent)'] = date.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        else:
+            fields['Recurrence'] = 'Weekly'
+            fields['When (if recurrent)'] = rng.choice(['Mondays 6pm', 'Thursdays 7pm', 'Saturdays 10am'])
+        events.append({'id': f"recEvent{i:06d}", 'fields': fields})
+    return places, events
+
+
+def install(n_places=500, n_events=200, seed=0):
+    """Makes the loader read generated records instead of calling Airtable."""
+    places, events = generate_records(n_places, n_events, seed)
+    StandInTable.records = {PLACES_TABLE_ID: places, EVENTS_TABLE_ID: events}
+    services.data_loader.Table = StandInTable
+    return PLACES_TABLE_ID, EVENTS_TABLE_ID
@@ -1,34 +1,130 @@
 from pyairtable import Table
 from collections import defaultdict
-from config.helpers import coerce_from_schema
-from config.schema import EVENTS_SCHEMA
+from config.helpers import coerce_from_schema, extract_place_info
+from config.schema import EVENTS_SCHEMA, PLACES_SCHEMA
+from services.metrics import timed_pages
 import os
 
 # for handling one-time events
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
+
+
+def start_of_today():
+    """Midnight today, the start date of the event filters for the whole day."""
+    return datetime.combine(date.today(), time.min)
+
+
+def build_event_item(ev, start_date, end_date):
+    """
+    Coerces an Airtable event record and applies the date filters.
+
+    Returns:
+        tuple: (ev_item, place_field, place_name), or None if the event
+            should not be shown (no place/link, or a one-time event outside
+            [start_date, end_date]).
+    """
+    f = ev.get('fields', {})
+
+    coerce_events_schema = lambda key: coerce_from_schema(f, EVENTS_SCHEMA, key)
+
+    # Filtering conditions
+    url = coerce_events_schema('Official Link')
+    place_field = coerce_events_schema('Place')
+    date = coerce_events_schema('Date (if not recurrent)')
+    when = coerce_events_schema('When (if recurrent)')
+    recurrence = coerce_events_schema('Recurrence')
+
+    if not place_field or not url:
+        return None
+    if recurrence == 'Once':
+        # parse date, which has format like this '2025-10-02T22:00:00.000Z'
+        # and check it is between start_date and end_date
+        if not date:
+            return None
+        try:
+            date = datetime.strptime(date[:19], "%Y-%m-%dT%H:%M:%S")
+        except ValueError:
+            return None
+        if not (start_date <= date <= end_date):
+            return None
+
+    ev_item = {
+        'id': ev.get('id'),
+        'name': coerce_events_schema('Name'),
+        'url': url,
+        'recurrence': recurrence,
+        'when': when,
+        'date': date
+    }
+    return ev_item, place_field, coerce_events_schema('Name (from Place)')
+
+
+def get_place_name_to_id(places):
+    # Build a mapping from place name to id for robustness (in case events reference names)
+    place_name_to_id = {}
+    for p in places:
+        name = p.get('name')
+        if name and name != PLACES_SCHEMA['Name']['default']:
+            place_name_to_id[str(name).strip()] = p.get('id')
+    return place_name_to_id
+
+
+def iter_records(pages):
+    """Flattens Airtable pages; each page can be freed once its records are consumed."""
+    for page in pages:
+        yield from page
+
+
+def link_events(events, place_name_to_id, start_date, end_date, place_id_to_events):
+    """Adds the events (any iterable of records) that pass the date filters to `place_id_to_events`."""
+    for ev in events:
+        built = build_event_item(ev, start_date, end_date)
+        if built is None:
+            continue
+        ev_item, place_field, place_name = built
+
+        # Determine which place(s) this event is linked to
+        place_ids = []
+        for p in place_field:
+            place_ids.append(p)
+        if not place_ids and place_name:
+            for p in place_name:
+                pid = place_name_to_id.get(str(p).strip())
+                if pid:
+                    place_ids.append(pid)
+        for pid in place_ids:
+            place_id_to_events[pid].append(ev_item)
+    return place_id_to_events
 
 
 def load_places_and_events(
     # airtable keys / ids
     api_key, base_id, places_table_id, events_table_id,
     # date filters
-    start_date=datetime.today(),
+    start_date=None,
     interval_days=14, cache_date=None):
     """
     Loads places and their associated events from Airtable tables.
 
+    Records are consumed page by page as Airtable returns them and turned into
+    their compact form right away, so the raw records are never all held in
+    memory at once.
+
     Args:
         api_key (str): Airtable API key.
         base_id (str): Airtable base ID.
         places_table_id (str): Table ID for places.
         events_table_id (str): Table ID for events.
-        start_date (datetime, optional): Start date for filtering one-time events. Defaults to today.
+        start_date (datetime, optional): Start date for filtering one-time events.
+            Defaults to `start_of_today()`.
         interval_days (int, optional): Number of days after start_date to set end_date. Defaults to 14.
 
     Returns:
         tuple:
-            - places_by_id (dict): Mapping of place ID to place record (dict).
+            - places_by_id (dict): Mapping of place ID to the place info returned by
+              `extract_place_info` (id, name, types, lat, lon, notes, url).
             - place_id_to_events (defaultdict[list]): Mapping of place ID to a list of event dicts. Each event dict contains:
+                - 'id' (str): Airtable record ID of the event
                 - 'name' (str): Event name
                 - 'url' (str): Official link for the event
                 - 'recurrence' (str): Recurrence type (e.g., 'Once')
@@ -36,73 +132,96 @@ def load_places_and_events(
                 - 'date' (datetime or None): Event date (for one-time events)
     """
     # End date to filter one-time events
+    start_date = start_date or start_of_today()
     end_date = start_date + timedelta(days=interval_days)
-    
+
     # Query places
     table = Table(api_key, base_id, places_table_id)
-    places = table.all()
-    places_by_id = {r.get('id'): r for r in places}
+    places_by_id = {}
+    for r in iter_records(timed_pages('places', table.iterate())):
+        places_by_id[r.get('id')] = extract_place_info(r)
 
     # Query events and link them to places
     events_table = Table(api_key, base_id, events_table_id)
-    events = events_table.all()
+    place_id_to_events = link_events(
+        iter_records(timed_pages('events', events_table.iterate())),
+        get_place_name_to_id(places_by_id.values()),
+        start_date, end_date, defaultdict(list)
+    )
 
-    # Build a mapping from place name to id for robustness (in case events reference names)
-    place_name_to_id = {}
-    for p in places:
-        fields = p.get('fields', {})
-        name = fields.get('Name')
-        if name:
-            place_name_to_id[str(name).strip()] = p.get('id')
+    return places_by_id, place_id_to_events
 
-    place_id_to_events = defaultdict(list)
 
-    for ev in events:
-        
-        f = ev.get('fields', {})
-        
-        coerce_events_schema = lambda key: coerce_from_schema(f, EVENTS_SCHEMA, key)
-        
-        # Filtering conditions
-        url = coerce_events_schema('Official Link')
-        place_field = coerce_events_schema('Place')
-        date = coerce_events_schema('Date (if not recurrent)')
-        when = coerce_events_schema('When (if recurrent)')
-        recurrence = coerce_events_schema('Recurrence')
-        
-        if not place_field or not url:
-            continue
-        if recurrence == 'Once':
-            # parse date, which has format like this '2025-10-02T22:00:00.000Z'
-            # and check it is between start_date and end_date
-            if not date:
-                continue
-            try:
-                date = datetime.strptime(date[:19], "%Y-%m-%dT%H:%M:%S")
-            except ValueError:
-                continue
-            if not (start_date <= date <= end_date):
-                continue
-            
-        ev_item = {
-            'name': coerce_events_schema('Name'),
-            'url': url,
-            'recurrence': recurrence,
-            'when': when,
-            'date': date
-        }
-        
-        # Determine which place(s) this event is linked to
-        place_ids = []
-        place_name = coerce_events_schema('Name (from Place)')
-        for p in place_field:
-            place_ids.append(p)
-        if not place_ids and place_name:
-            for p in place_name:
-                pid = place_name_to_id.get(str(p).strip())
-                if pid:
-                    place_ids.append(pid)
-        for pid in place_ids:
-            place_id_to_events[pid].append(ev_item)
+def fetch_records_by_id(table, record_ids):
+    """Streams only the given records of a table (one paginated request)."""
+    if not record_ids:
+        return iter(())
+    formula = "OR(" + ",".join(f"RECORD_ID()='{rid}'" for rid in sorted(record_ids)) + ")"
+    return iter_records(table.iterate(formula=formula))
+
+
+def fetch_record_changes(changes, api_key, base_id, places_table_id, events_table_id):
+    """
+    Fetches the records listed as changed in `changes` (see `apply_record_changes`).
+
+    Returns:
+        tuple: (changed_places, changed_events), lists of raw Airtable records.
+    """
+    changed_places = fetch_records_by_id(
+        Table(api_key, base_id, places_table_id),
+        changes.get(places_table_id, {}).get('changed')
+    )
+    changed_events = fetch_records_by_id(
+        Table(api_key, base_id, events_table_id),
+        changes.get(events_table_id, {}).get('changed')
+    )
+    return list(changed_places), list(changed_events)
+
+
+def apply_record_changes(
+    places_by_id, place_id_to_events, changes, changed_places, changed_events,
+    places_table_id, events_table_id,
+    # date filters
+    start_date=None, interval_days=14):
+    """
+    Updates the output of `load_places_and_events` in place with changed records only.
+
+    Args:
+        places_by_id (dict), place_id_to_events (defaultdict[list]): As returned by
+            `load_places_and_events`.
+        changes (dict): {table_id: {'changed': set of record IDs (created or updated),
+            'destroyed': set of record IDs}}, e.g. from `services.webhooks.collect_changes`.
+        changed_places, changed_events (list): The changed records, as returned by
+            `fetch_record_changes`. Fetched once, they can be applied to every window.
+        start_date (datetime, optional): Must be the one the data was loaded with.
+            Defaults to `start_of_today()`, as in `load_places_and_events`.
+
+    Returns:
+        tuple: (places_by_id, place_id_to_events), updated.
+    """
+    start_date = start_date or start_of_today()
+    end_date = start_date + timedelta(days=interval_days)
+
+    place_changes = changes.get(places_table_id, {})
+    for pid in place_changes.get('destroyed', ()):
+        places_by_id.pop(pid, None)
+        place_id_to_events.pop(pid, None)
+    for r in changed_places:
+        places_by_id[r.get('id')] = extract_place_info(r)
+
+    event_changes = changes.get(events_table_id, {})
+    stale_event_ids = set(event_changes.get('destroyed', ())) | set(event_changes.get('changed', ()))
+    if stale_event_ids:
+        # Drop the old version of changed events from every place they were linked to
+        for pid in list(place_id_to_events):
+            kept = [e for e in place_id_to_events[pid] if e.get('id') not in stale_event_ids]
+            if kept:
+                place_id_to_events[pid] = kept
+            else:
+                del place_id_to_events[pid]
+        link_events(
+            changed_events, get_place_name_to_id(places_by_id.values()),
+            start_date, end_date, place_id_to_events
+        )
 
     return places_by_id, place_id_to_events
@@ -0,0 +1,75 @@
+"""
+Response compression and conditional (ETag / 304) responses.
+
+Compression is done by Flask-Compress (the same package Dash's `compress`
+option uses), configured here so the JSON callback/layout responses and the tiles are
+covered. Flask-Compress appends ":<algorithm>" to the ETag of compressed
+responses, so ETag matching below accepts both forms.
+"""
+import hashlib
+
+import flask
+from flask_compress import Compress
+
+COMPRESS_MIMETYPES = [
+    'text/html',
+    'text/css',
+    'text/javascript',
+    'application/javascript',
+    'application/json',
+    'application/geo+json',
+]
+# Dash endpoints that are plain GETs with content that only changes on deploy
+CONDITIONAL_GET_PATHS = ('_dash-layout', '_dash-dependencies')
+
+
+def enable_compression(server):
+    """
+    Compresses responses with brotli/gzip (whichever the client accepts).
+    Must be called before any other after_request hook that should see the
+    uncompressed response is registered, as Flask runs them in reverse order.
+    """
+    server.config.setdefault('COMPRESS_MIMETYPES', COMPRESS_MIMETYPES)
+    server.config.setdefault('COMPRESS_ALGORITHM', ['br', 'gzip'])
+    Compress(server)
+    return server
+
+
+def matching_etag(etag):
+    """Returns the If-None-Match value matching `etag`, if the client sent one."""
+    for candidate in flask.request.if_none_match.as_set(include_weak=True):
+        if candidate.split(':', 1)[0] == etag:
+            return candidate
+    return None
+
+
+def conditional_response(payload, etag, mimetype):
+    """A 304 if the client already has `etag`, otherwise `payload` tagged with it."""
+    matched = matching_etag(etag)
+    if matched:
+        response = flask.Response(status=304)
+        response.set_etag(matched)
+    else:
+        response = flask.Response(payload, mimetype=mimetype)
+        response.set_etag(etag)
+    return response
+
+
+def enable_conditional_get(server, path_suffixes=CONDITIONAL_GET_PATHS):
+    """Adds content-hash ETags (and 304s) to successful GETs of the given paths."""
+    @server.after_request
+    def conditional_get(response):
+        if (flask.request.method != 'GET' or response.status_code != 200
+                or response.direct_passthrough
+                or not flask.request.path.endswith(path_suffixes)):
+            return response
+        etag = hashlib.sha1(response.get_data()).hexdigest()[:16]
+        matched = matching_etag(etag)
+        if matched:
+            not_modified = flask.Response(status=304)
+            not_modified.set_etag(matched)
+            return not_modified
+        response.set_etag(etag)
+        return response
+
+    return server
@@ -0,0 +1,281 @@
+"""
+Lightweight in-process metrics with Prometheus text exposition.
+
+Everything lives in module-level registries so any module (app.py, the
+data loader, ...) can record without passing objects around. Metrics are
+per-process: when running several gunicorn workers, each worker exposes
+its own numbers and Prometheus should scrape them individually.
+"""
+import json
+import threading
+import time
+from functools import wraps
+
+import flask
+from dash.exceptions import PreventUpdate
+
+# Histogram buckets (seconds) for callback latency and Airtable fetches
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Histogram buckets (bytes) for serialized callback responses
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_lock = threading.Lock()
+_local = threading.local()
+_registry = []
+
+
+def _format_labels(label_names, label_values, extra=()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = [
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in pairs
+    ]
+    return '{' + ','.join(escaped) + '}'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, '')) for n in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with _lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts..., +Inf count, sum]
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += 1
+            state[-1] += value
+
+    def _render_sample(self, key, state):
+        lines = []
+        for bound, count in zip(self.buckets, state):
+            labels = _format_labels(self.label_names, key, [('le', bound)])
+            lines.append(f"{self.name}_bucket{labels} {count}")
+        labels = _format_labels(self.label_names, key, [('le', '+Inf')])
+        lines.append(f"{self.name}_bucket{labels} {state[-2]}")
+        labels = _format_labels(self.label_names, key)
+        lines.append(f"{self.name}_count{labels} {state[-2]}")
+        lines.append(f"{self.name}_sum{labels} {state[-1]}")
+        return lines
+
+
+# Metrics recorded across the app
+CALLBACK_LATENCY = Histogram(
+    'dash_callback_duration_seconds', 'Time spent inside a Dash callback.',
+    labels=('callback',))
+CALLBACK_REQUEST_LATENCY = Histogram(
+    'dash_callback_request_duration_seconds',
+    'Whole _dash-update-component request time, including JSON encoding and compression.',
+    labels=('callback',))
+CALLBACK_RESPONSE_BYTES = Histogram(
+    'dash_callback_response_bytes', 'Size of the serialized callback response.',
+    labels=('callback',), buckets=SIZE_BUCKETS)
+CALLBACK_TRIGGERS = Counter(
+    'dash_callback_triggers_total', 'Callback invocations by triggering component.',
+    labels=('callback', 'trigger'))
+CALLBACK_ERRORS = Counter(
+    'dash_callback_errors_total', 'Callback invocations that raised an exception.',
+    labels=('callback',))
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'Memoized lookups by result (hit or miss).',
+    labels=('cache', 'result'))
+AIRTABLE_FETCH_LATENCY = Histogram(
+    'airtable_fetch_duration_seconds', 'Time spent fetching a full Airtable table.',
+    labels=('table',))
+AIRTABLE_FETCH_RECORDS = Gauge(
+    'airtable_fetch_records', 'Number of records returned by the last Airtable fetch.',
+    labels=('table',))
+
+
+def render_metrics():
+    """Returns all registered metrics in the Prometheus text format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def _trigger_label():
+    # Keep label cardinality low: pattern-matching ids collapse to their 'type'
+    try:
+        from dash import callback_context
+        trigger_id = callback_context.triggered_id
+    except Exception:
+        return ''
+    if isinstance(trigger_id, dict):
+        return trigger_id.get('type', json.dumps(trigger_id, sort_keys=True))
+    return trigger_id or 'initial'
+
+
+def timed_callback(func):
+    """Wraps a Dash callback to record latency, trigger and errors."""
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        # Remembered for the after_request hook which measures the response size
+        if flask.has_request_context():
+            flask.g.dash_callback_name = name
+        CALLBACK_TRIGGERS.inc(callback=name, trigger=_trigger_label())
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except PreventUpdate:
+            raise
+        except Exception:
+            CALLBACK_ERRORS.inc(callback=name)
+            raise
+        finally:
+            CALLBACK_LATENCY.observe(time.perf_counter() - start, callback=name)
+
+    return wrapper
+
+
+def track_cache(cache_name):
+    """
+    Decorator placed *outside* a memoized function to count hits and misses.
+    The memoized body must call `mark_cache_miss()` so a run of the body
+    (i.e. a miss) can be told apart from a value served from the cache.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            _local.cache_miss = False
+            result = func(*args, **kwargs)
+            hit = not getattr(_local, 'cache_miss', False)
+            CACHE_REQUESTS.inc(cache=cache_name, result='hit' if hit else 'miss')
+            return result
+        return wrapper
+    return decorator
+
+
+def mark_cache_miss():
+    _local.cache_miss = True
+
+
+def timed_pages(table_name, pages):
+    """
+    Passes through the pages of an Airtable fetch (e.g. `Table.iterate()`),
+    recording the time spent waiting on Airtable and the record count.
+    """
+    elapsed = 0.0
+    count = 0
+    pages = iter(pages)
+    while True:
+        start = time.perf_counter()
+        page = next(pages, None)
+        elapsed += time.perf_counter() - start
+        if page is None:
+            break
+        count += len(page)
+        yield page
+    AIRTABLE_FETCH_LATENCY.observe(elapsed, table=table_name)
+    AIRTABLE_FETCH_RECORDS.set(count, table=table_name)
+
+
+def wrap_callbacks(app, wrapper):
+    """
+    Patches `app.callback` so every callback declared afterwards is registered
+    as `wrapper(func)`. The module-level name still refers to the plain
+    function, so callbacks stay directly callable.
+    """
+    register = app.callback
+
+    def callback(*args, **kwargs):
+        decorator = register(*args, **kwargs)
+
+        def wrap(func):
+            decorator(wrapper(func))
+            return func
+        return wrap
+
+    app.callback = callback
+
+
+def instrument_app(app, route='/metrics'):
+    """
+    Instruments every callback registered through `app.callback` from now on
+    and exposes the registry at `route` on the underlying Flask server.
+    Must be called before the callbacks are declared.
+    """
+    wrap_callbacks(app, timed_callback)
+
+    @app.server.before_request
+    def start_request_timer():
+        flask.g.request_start = time.perf_counter()
+
+    @app.server.after_request
+    def record_response_size(response):
+        name = flask.g.get('dash_callback_name')
+        if name and response.status_code == 200:
+            size = response.content_length
+            if size is None:
+                size = len(response.get_data())
+            CALLBACK_RESPONSE_BYTES.observe(size, callback=name)
+        return response
+
+    @app.server.teardown_request
+    def record_request_duration(exc):
+        # Runs after every after_request hook, so compression is included
+        name = flask.g.get('dash_callback_name')
+        start = flask.g.get('request_start')
+        if name and start is not None:
+            CALLBACK_REQUEST_LATENCY.observe(time.perf_counter() - start, callback=name)
+
+    @app.server.route(route)
+    def metrics():
+        return flask.Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+    return app
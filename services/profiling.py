@@ -0,0 +1,149 @@
+"""
+Opt-in sampling profiler for Dash callback requests.
+
+Controlled by environment variables (all off by default):
+
+- PROFILE_SAMPLE_RATE: fraction (0-1) of callback requests to profile.
+- PROFILE_SLOW_MS: also keep the profile of any request slower than this.
+- PROFILE_INTERVAL_MS: time between stack samples (default 1ms).
+- PROFILE_DIR: where the profiles are written (default `profiles`).
+
+The whole `_dash-update-component` request is profiled, not only the
+callback function, since encoding the returned components to JSON happens
+in Dash after the callback returns and is often where the time goes.
+
+Stacks are appended to `<PROFILE_DIR>/<callback name>.collapsed` in the
+collapsed-stack format ("frame;frame;frame count"), which flamegraph.pl,
+speedscope and inferno can all read directly.
+
+When neither PROFILE_SAMPLE_RATE nor PROFILE_SLOW_MS is set, no hooks are
+registered, so the disabled mode costs nothing per request.
+"""
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+import flask
+
+
+def _env_float(name, default=None):
+    try:
+        return float(os.environ[name])
+    except (KeyError, ValueError):
+        return default
+
+
+SAMPLE_RATE = _env_float('PROFILE_SAMPLE_RATE', 0.0)
+SLOW_MS = _env_float('PROFILE_SLOW_MS')
+INTERVAL_MS = _env_float('PROFILE_INTERVAL_MS', 1.0)
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+
+ENABLED = SAMPLE_RATE > 0 or SLOW_MS is not None
+
+_write_lock = threading.Lock()
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    One background thread sampling the stacks of the registered threads.
+
+    All profiled requests share it, so concurrent requests cost one
+    `sys._current_frames()` call per interval instead of one each.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._stacks = {}  # thread id -> Counter of collapsed stacks
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            self._active.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            # Recording under the lock: once `stop` returns, its Counter is final
+            with self._lock:
+                for thread_id, stacks in self._stacks.items():
+                    frame = frames.get(thread_id)
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    if stack:
+                        # Collapsed stacks are written root first
+                        stacks[';'.join(reversed(stack))] += 1
+
+    def start(self, thread_id):
+        """Starts sampling `thread_id`; returns the Counter its stacks go to."""
+        stacks = Counter()
+        with self._lock:
+            self._stacks[thread_id] = stacks
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+            self._active.set()
+        return stacks
+
+    def stop(self, thread_id):
+        with self._lock:
+            self._stacks.pop(thread_id, None)
+            if not self._stacks:
+                # Idle until the next profiled request
+                self._active.clear()
+
+
+def write_collapsed(name, stacks):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{name}.collapsed")
+    with _write_lock, open(path, 'a') as f:
+        for stack, count in stacks.items():
+            f.write(f"{stack} {count}\n")
+
+
+def _callback_name(app):
+    body = flask.request.get_json(silent=True) or {}
+    callback = app.callback_map.get(body.get('output'), {}).get('callback')
+    return getattr(callback, '__name__', None) or 'unknown_callback'
+
+
+def instrument_app(app):
+    """Profiles sampled or slow callback requests, if profiling is enabled."""
+    if not ENABLED:
+        return app
+    sampler = StackSampler(INTERVAL_MS / 1000)
+
+    @app.server.before_request
+    def start_profile():
+        if not flask.request.path.endswith('_dash-update-component'):
+            return
+        sampled = random.random() < SAMPLE_RATE
+        if not sampled and SLOW_MS is None:
+            return
+        # A slow request is only known to be slow at the end, so with a
+        # threshold set every request is sampled and the cheap ones dropped
+        stacks = sampler.start(threading.get_ident())
+        flask.g.profile = (stacks, sampled, time.perf_counter())
+
+    @app.server.teardown_request
+    def stop_profile(exc):
+        profile = flask.g.pop('profile', None)
+        if profile is None:
+            return
+        stacks, sampled, start = profile
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        sampler.stop(threading.get_ident())
+        slow = SLOW_MS is not None and elapsed_ms >= SLOW_MS
+        if (sampled or slow) and stacks:
+            write_collapsed(_callback_name(app), stacks)
+
+    return app
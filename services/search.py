@@ -0,0 +1,94 @@
+"""
+Full-text and typeahead search over place names, types and notes.
+
+The index is built once per snapshot (see `Snapshot.derived`):
+
+- an inverted index: token -> {place id: score}, where a token found in the
+  name weighs more than one found in the types, which weighs more than one
+  found in the notes;
+- the sorted list of all tokens, used as a prefix index: all tokens starting
+  with a prefix form one contiguous slice found with two bisects.
+
+A query matches places containing every query token; the last token is
+treated as a prefix so results update while the user is still typing.
+"""
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left
+
+FIELD_WEIGHTS = (('name', 3.0), ('types', 2.0), ('notes', 1.0))
+# Caps how many index tokens a (short) prefix may expand to
+MAX_PREFIX_EXPANSION = 200
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercases, strips accents and splits `text` into alphanumeric tokens."""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return _TOKEN_RE.findall(text)
+
+
+class SearchIndex:
+    def __init__(self, places):
+        self.postings = {}
+        self.names = {}
+        for place in places:
+            pid = place['id']
+            self.names[pid] = place.get('name') or ''
+            for field, weight in FIELD_WEIGHTS:
+                value = place.get(field)
+                if isinstance(value, list):
+                    value = ' '.join(value)
+                for token in tokenize(value):
+                    scores = self.postings.setdefault(token, {})
+                    scores[pid] = scores.get(pid, 0.0) + weight
+        self.tokens = sorted(self.postings)
+
+    def _prefix_scores(self, prefix):
+        """Merged postings of all tokens starting with `prefix`."""
+        start = bisect_left(self.tokens, prefix)
+        merged = {}
+        for token in self.tokens[start:start + MAX_PREFIX_EXPANSION]:
+            if not token.startswith(prefix):
+                break
+            # Exact matches rank above completions
+            factor = 1.0 if token == prefix else 0.5
+            for pid, score in self.postings[token].items():
+                merged[pid] = max(merged.get(pid, 0.0), score * factor)
+        return merged
+
+    def search(self, query, limit=None):
+        """
+        Returns place ids matching every token of `query`, best match first.
+        An empty query returns None (meaning "no search filter").
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        totals = None
+        for i, token in enumerate(tokens):
+            if i == len(tokens) - 1:
+                scores = self._prefix_scores(token)
+            else:
+                scores = self.postings.get(token, {})
+            if totals is None:
+                # Never mutated: later tokens build a new dict
+                totals = scores
+            else:
+                totals = {pid: s + scores[pid] for pid, s in totals.items() if pid in scores}
+            if not totals:
+                return []
+        key = lambda pid: (-totals[pid], self.names[pid])
+        if limit:
+            # Typeahead: only the best few of possibly thousands of matches
+            return heapq.nsmallest(limit, totals, key=key)
+        return sorted(totals, key=key)
+
+
+def build_search_index(snapshot):
+    return SearchIndex(snapshot.places)
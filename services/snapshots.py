@@ -0,0 +1,103 @@
+"""
+Versioned, per-process snapshots of the places data.
+
+A snapshot is the list of place dicts shown for one event window, plus a
+content hash (`version`) and whatever structures were derived from it
+(tile index, search index, ...). Derived structures are built lazily once
+per snapshot and reused by every request until the data actually changes.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class Snapshot:
+    def __init__(self, places):
+        self.places = places
+        self.places_by_id = {p['id']: p for p in places}
+        self.version = hashlib.sha1(
+            json.dumps(places, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()[:12]
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def derived(self, name, build):
+        """Returns `build(self)`, computed once per snapshot and cached under `name`."""
+        value = self._derived.get(name)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = self._derived[name] = build(self)
+        return value
+
+
+class LRUCache:
+    """Thread-safe LRU of values built on demand, e.g. derived from a snapshot."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        value = build()
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+
+class SnapshotStore:
+    """
+    Holds the current snapshot per event window.
+
+    Args:
+        load (callable): `load(interval_days)` returning the list of place dicts.
+        ttl (int): Seconds after which the data is reloaded. If the reloaded
+            data hashes to the same version, the old snapshot (and everything
+            derived from it) is kept.
+        warm (callable, optional): Called with every new snapshot before it is
+            served, to precompute derived structures off the request path.
+    """
+
+    def __init__(self, load, ttl, warm=None):
+        self.load = load
+        self.ttl = ttl
+        self.warm = warm
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def get(self, interval_days):
+        entry = self._snapshots.get(interval_days)
+        if entry and time.monotonic() - entry[1] < self.ttl:
+            return entry[0]
+        with self._lock:
+            entry = self._snapshots.get(interval_days)
+            if entry and time.monotonic() - entry[1] < self.ttl:
+                return entry[0]
+            snapshot = Snapshot(self.load(interval_days))
+            if entry and entry[0].version == snapshot.version:
+                snapshot = entry[0]
+            elif self.warm:
+                self.warm(snapshot)
+            self._snapshots[interval_days] = (snapshot, time.monotonic())
+            return snapshot
+
+    def invalidate(self, interval_days=None):
+        """Forces a reload on the next `get` for one window (or all of them)."""
+        with self._lock:
+            windows = list(self._snapshots) if interval_days is None else [interval_days]
+            for window in windows:
+                entry = self._snapshots.get(window)
+                if entry:
+                    # Keep the snapshot around so an unchanged reload can reuse it
+                    self._snapshots[window] = (entry[0], float('-inf'))
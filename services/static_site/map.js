@@ -0,0 +1,290 @@
+// Static version of the map: all filtering happens in the browser, the data
+// comes from the versioned bundle written by build_static.py.
+(function () {
+    'use strict';
+
+    const state = {
+        manifest: null,
+        views: null,
+        allTypes: [],
+        places: [],
+        selectedTypes: [],
+        onlyEvents: false,
+        windowDays: null,
+        query: '',
+        searchIndex: null,
+        // Place ids matching the query as {id: rank}; null when not searching
+        searchRank: null,
+        // Place ids ordered by distance to the current view's center, precomputed
+        // for the first paint and preset jumps
+        precomputedIds: null,
+        settingView: false,
+    };
+
+    const map = L.map('main-map');
+    L.tileLayer('https://{s}.basemaps.cartocdn.com/dark_all/{z}/{x}/{y}{r}.png', {
+        attribution: '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors &copy; <a href="https://carto.com/attributions">CARTO</a>'
+    }).addTo(map);
+    const markerLayer = L.layerGroup().addTo(map);
+
+    // Shared with the Dash app's tiled markers (assets/place_popup.js)
+    const {el, renderNotes, typeBadges, firstEvent, eventLink, mapsLink} = window.placePopup;
+
+    function tokenize(text) {
+        return (text || '').normalize('NFKD').replace(/\p{M}/gu, '').toLowerCase().match(/[a-z0-9]+/g) || [];
+    }
+
+    function fetchJson(path) {
+        return fetch(path).then((r) => {
+            if (!r.ok) throw new Error(path + ': ' + r.status);
+            return r.json();
+        });
+    }
+
+    // --- Search (mirrors services/search.py) ---
+
+    const FIELD_WEIGHTS = [['name', 3], ['types', 2], ['notes', 1]];
+    // Caps how many index tokens a (short) prefix may expand to
+    const MAX_PREFIX_EXPANSION = 200;
+
+    function buildSearchIndex(places) {
+        const postings = new Map();
+        const names = new Map();
+        places.forEach((p) => {
+            names.set(p.id, p.name || '');
+            FIELD_WEIGHTS.forEach(([field, weight]) => {
+                const value = Array.isArray(p[field]) ? p[field].join(' ') : p[field];
+                tokenize(value).forEach((token) => {
+                    if (!postings.has(token)) postings.set(token, new Map());
+                    const scores = postings.get(token);
+                    scores.set(p.id, (scores.get(p.id) || 0) + weight);
+                });
+            });
+        });
+        return {postings: postings, names: names, tokens: Array.from(postings.keys()).sort()};
+    }
+
+    // Merged postings of all tokens starting with `prefix`
+    function prefixScores(index, prefix) {
+        let lo = 0;
+        let hi = index.tokens.length;
+        while (lo < hi) {
+            const mid = (lo + hi) >> 1;
+            if (index.tokens[mid] < prefix) lo = mid + 1; else hi = mid;
+        }
+        const merged = new Map();
+        for (const token of index.tokens.slice(lo, lo + MAX_PREFIX_EXPANSION)) {
+            if (!token.startsWith(prefix)) break;
+            // Exact matches rank above completions
+            const factor = token === prefix ? 1 : 0.5;
+            index.postings.get(token).forEach((score, id) => {
+                merged.set(id, Math.max(merged.get(id) || 0, score * factor));
+            });
+        }
+        return merged;
+    }
+
+    // Ids of the places matching every token of `query`, best match first.
+    // The last token is a prefix; null for a query without any token.
+    function search(index, query) {
+        const tokens = tokenize(query);
+        if (!tokens.length) return null;
+        let totals = null;
+        for (let i = 0; i < tokens.length; i++) {
+            const scores = i === tokens.length - 1
+                ? prefixScores(index, tokens[i])
+                : index.postings.get(tokens[i]) || new Map();
+            if (totals === null) {
+                totals = scores;
+            } else {
+                const next = new Map();
+                totals.forEach((s, id) => { if (scores.has(id)) next.set(id, s + scores.get(id)); });
+                totals = next;
+            }
+            if (!totals.size) return [];
+        }
+        const byName = (a, b) => (a < b ? -1 : a > b ? 1 : 0);
+        return Array.from(totals.keys()).sort((a, b) =>
+            (totals.get(b) - totals.get(a)) || byName(index.names.get(a), index.names.get(b)));
+    }
+
+    function updateSearch() {
+        const ids = state.searchIndex ? search(state.searchIndex, state.query) : null;
+        state.searchRank = ids && new Map(ids.map((id, i) => [id, i]));
+    }
+
+    // --- Filtering (mirrors update_info_and_list in app.py) ---
+
+    function isDefaultFilters() {
+        return !state.onlyEvents && !state.searchRank && state.selectedTypes.length === state.allTypes.length;
+    }
+
+    function filteredPlaces() {
+        const selected = new Set(state.selectedTypes);
+        return state.places.filter((p) => {
+            if (p.lat === null || p.lon === null) return false;
+            if (state.searchRank && !state.searchRank.has(p.id)) return false;
+            if (selected.size && p.types.length && !p.types.some((t) => selected.has(t))) return false;
+            if (state.onlyEvents && !p.events.length) return false;
+            return true;
+        });
+    }
+
+    function roughDistance(lat1, lon1, lat2, lon2) {
+        const latDiff = lat2 - lat1;
+        const lonDiff = (lon2 - lon1) * Math.cos(lat1 * Math.PI / 180);
+        return latDiff * latDiff + lonDiff * lonDiff;
+    }
+
+    // --- Rendering ---
+
+    function listItem(place) {
+        const item = el('div', 'resource-item');
+        item.appendChild(el('h4', 'resource-item-title', place.name));
+        if (place.types.length) item.appendChild(typeBadges(place.types));
+        const event = firstEvent(place);
+        if (event) item.appendChild(eventLink(event, 'event-link event-link--small'));
+        if (place.notes) item.appendChild(renderNotes(place.notes, 'notes notes--compact'));
+        const maps = mapsLink(place, 'google-maps-link google-maps-link--small');
+        if (maps) item.appendChild(maps);
+        return item;
+    }
+
+    let currentFiltered = [];
+
+    function renderMarkers() {
+        currentFiltered = filteredPlaces();
+        markerLayer.clearLayers();
+        currentFiltered.forEach((p) => {
+            L.marker([p.lat, p.lon])
+                .bindPopup(() => window.placePopup.content(p), window.placePopup.options)
+                .addTo(markerLayer);
+        });
+    }
+
+    function renderList() {
+        const bounds = map.getBounds();
+        const center = bounds.getCenter();
+        let candidates = currentFiltered;
+        if (state.precomputedIds && isDefaultFilters()) {
+            const byId = state.placesById;
+            candidates = state.precomputedIds.map((id) => byId[id]).filter(Boolean);
+            // Places of another event window that the views were not built from
+            const ordered = new Set(candidates);
+            candidates = candidates.concat(currentFiltered.filter((p) => !ordered.has(p)));
+        }
+        const visible = candidates.filter((p) => bounds.contains([p.lat, p.lon]));
+        if (state.searchRank) {
+            // By search relevance when searching
+            visible.sort((a, b) => state.searchRank.get(a.id) - state.searchRank.get(b.id));
+        } else {
+            // Already in order after a preset jump, up to near-ties between the
+            // preset center and the bounds center, which this sort fixes cheaply
+            visible.sort((a, b) => roughDistance(center.lat, center.lng, a.lat, a.lon) - roughDistance(center.lat, center.lng, b.lat, b.lon));
+        }
+        const list = document.getElementById('resource-list');
+        list.replaceChildren(...visible.map(listItem));
+        document.getElementById('results-info').textContent =
+            `Showing ${visible.length}/${currentFiltered.length} locations on the map`;
+    }
+
+    function render() {
+        renderMarkers();
+        renderList();
+        renderPills();
+    }
+
+    // --- Pills (same selection rules as update_selected_types in app.py) ---
+
+    function clickType(type) {
+        const selected = state.selectedTypes;
+        if (selected.length === state.allTypes.length) {
+            state.selectedTypes = [type];
+        } else if (selected.includes(type)) {
+            state.selectedTypes = selected.length === 1 ? state.allTypes.slice() : selected.filter((t) => t !== type);
+        } else {
+            state.selectedTypes = selected.concat([type]);
+        }
+        render();
+    }
+
+    function renderPills() {
+        const container = document.getElementById('pill-container');
+        const eventsPill = state.manifest.events_pill;
+        const pills = state.allTypes.map((type) => {
+            const pill = el('button', 'filter-pill' + (state.selectedTypes.includes(type) ? ' active' : ''), type);
+            pill.onclick = () => clickType(type);
+            return pill;
+        });
+        const events = el('button', 'filter-pill filter-pill--event' + (state.onlyEvents ? ' active' : ''), eventsPill);
+        events.onclick = () => { state.onlyEvents = !state.onlyEvents; render(); };
+        pills.push(events);
+
+        const group = el('div', 'event-window-group');
+        state.manifest.windows.forEach((w) => {
+            const pill = el('button', 'filter-pill filter-pill--event' + (w.value === state.windowDays ? ' active' : ''), w.label);
+            pill.onclick = () => loadWindow(w.value);
+            group.appendChild(pill);
+        });
+        pills.push(group);
+
+        container.className = 'pill-container' + (state.onlyEvents ? ' show-event-window' : '');
+        container.replaceChildren(...pills);
+    }
+
+    // --- Data loading ---
+
+    function loadWindow(days) {
+        const entry = state.manifest.windows.find((w) => w.value === days);
+        return fetchJson(entry.places).then((places) => {
+            state.places = places;
+            state.searchIndex = buildSearchIndex(places);
+            updateSearch();
+            state.placesById = Object.fromEntries(places.map((p) => [p.id, p]));
+            state.windowDays = days;
+            render();
+        });
+    }
+
+    function showView(view) {
+        // setView fires its move events synchronously; they must not clear the ids
+        state.settingView = true;
+        // Presets have no zoom: they only recenter, as jump_to_preset_location in app.py
+        map.setView(view.center, 'zoom' in view ? view.zoom : map.getZoom(), {animate: false});
+        state.settingView = false;
+        state.precomputedIds = view.ids;
+    }
+
+    function renderPresets() {
+        const container = document.getElementById('location-presets');
+        Object.entries(state.views.presets).forEach(([name, view]) => {
+            const button = el('button', 'location-preset-btn', name);
+            button.onclick = () => { showView(view); renderList(); };
+            container.appendChild(button);
+        });
+    }
+
+    // The manifest is the only file that is not cached forever
+    fetchJson('manifest.json?ts=' + Date.now()).then((manifest) => {
+        state.manifest = manifest;
+        return Promise.all([fetchJson(manifest.types), fetchJson(manifest.views)]);
+    }).then(([types, views]) => {
+        state.allTypes = types;
+        state.selectedTypes = types.slice();
+        state.views = views;
+        renderPresets();
+        showView(views.initial);
+        map.on('dragstart zoomstart', () => { if (!state.settingView) state.precomputedIds = null; });
+        map.on('moveend', () => { if (!state.settingView) renderList(); });
+
+        let searchTimer = null;
+        document.getElementById('search-input').addEventListener('input', (e) => {
+            clearTimeout(searchTimer);
+            searchTimer = setTimeout(() => { state.query = e.target.value; updateSearch(); render(); }, 300);
+        });
+        return loadWindow(state.manifest.default_window);
+    }).catch((err) => {
+        document.getElementById('results-info').textContent = 'Could not load the map data.';
+        console.error(err);
+    });
+})();
@@ -0,0 +1,160 @@
+"""
+Places served as z/x/y tiles (slippy-map scheme) so a client only has to
+download the part of the dataset that is in view. The map's marker layer
+loads them through assets/place_tiles.js.
+
+Tiles are GeoJSON FeatureCollections of points, encoded as geobuf (`.pbf`)
+or plain JSON (`.geojson`). Places are bucketed per zoom level once per
+snapshot; encoded tiles are kept in an LRU keyed by snapshot version,
+tile, type filter and format, and served with ETags so browsers and CDNs
+can revalidate with a 304.
+"""
+import hashlib
+import json
+from math import cos, log, pi, radians, tan, floor
+
+import flask
+import geobuf
+
+from services.http_caching import conditional_response
+from services.snapshots import LRUCache
+
+MAX_ZOOM = 18
+# Deepest tile served; beyond this tiles are a few metres wide and y overflows
+MAX_REQUEST_ZOOM = 24
+TILE_CACHE_SIZE = 2048
+
+
+def tile_for(lat, lon, zoom):
+    """Returns the (x, y) of the tile containing (lat, lon) at `zoom`."""
+    n = 2 ** zoom
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = int(floor((lon + 180.0) / 360.0 * n))
+    y = int(floor((1.0 - log(tan(radians(lat)) + 1 / cos(radians(lat))) / pi) / 2.0 * n))
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def build_tile_index(snapshot):
+    """
+    Buckets the places of a snapshot by tile for every zoom level up to MAX_ZOOM.
+
+    Returns:
+        dict: {zoom: {(x, y): [place, ...]}}
+    """
+    index = {z: {} for z in range(MAX_ZOOM + 1)}
+    for place in snapshot.places:
+        if place['lat'] is None or place['lon'] is None:
+            continue
+        x, y = tile_for(place['lat'], place['lon'], MAX_ZOOM)
+        for z in range(MAX_ZOOM, -1, -1):
+            shift = MAX_ZOOM - z
+            index[z].setdefault((x >> shift, y >> shift), []).append(place)
+    return index
+
+
+def place_feature(place):
+    return {
+        'type': 'Feature',
+        'id': place['id'],
+        'geometry': {'type': 'Point', 'coordinates': [place['lon'], place['lat']]},
+        'properties': {
+            'id': place['id'],
+            'name': place['name'],
+            'types': place['types'],
+            'notes': place['notes'],
+            'url': place['url'],
+            # Only what the popup and the events filter need; event dates
+            # are not JSON-serializable
+            'events': [
+                {'name': e.get('name'), 'url': e.get('url')}
+                for e in (place.get('events') or []) if e
+            ],
+        },
+    }
+
+
+def encode_tile(places, fmt):
+    collection = {'type': 'FeatureCollection', 'features': [place_feature(p) for p in places]}
+    if fmt == 'pbf':
+        return geobuf.encode(collection)
+    return json.dumps(collection).encode('utf-8')
+
+
+class TileCache(LRUCache):
+    """Thread-safe LRU of encoded tiles: key -> (payload, etag)."""
+
+    def __init__(self, maxsize=TILE_CACHE_SIZE):
+        super().__init__(maxsize)
+
+    def get_or_build(self, key, build):
+        def build_with_etag():
+            payload = build()
+            return payload, hashlib.sha1(payload).hexdigest()[:16]
+        return super().get_or_build(key, build_with_etag)
+
+
+def get_tile(snapshot, cache, z, x, y, types, fmt):
+    """Returns (payload, etag) of one tile, optionally restricted to `types`."""
+    types_key = tuple(sorted(types)) if types else ()
+    key = (snapshot.version, z, x, y, types_key, fmt)
+
+    def build():
+        index = snapshot.derived('tile_index', build_tile_index)
+        if z > MAX_ZOOM:
+            # Deeper tiles are a subset of their MAX_ZOOM ancestor
+            shift = z - MAX_ZOOM
+            ancestor = index[MAX_ZOOM].get((x >> shift, y >> shift), [])
+            places = [p for p in ancestor if tile_for(p['lat'], p['lon'], z) == (x, y)]
+        else:
+            places = index[z].get((x, y), [])
+        if types_key:
+            # Places without a type are kept, as in the map callback
+            wanted = set(types_key)
+            places = [p for p in places if not p['types'] or wanted.intersection(p['types'])]
+        return encode_tile(places, fmt)
+
+    return cache.get_or_build(key, build)
+
+
+def register_tile_routes(server, snapshots, windows, default_window):
+    """
+    Adds `/tiles/<z>/<x>/<y>.pbf` and `.geojson` to the Flask server.
+
+    Query parameters:
+        window: event window in days (one of `windows`, defaults to `default_window`).
+        types: place type to keep, repeated for each type (all types if omitted).
+            Places without any type are always kept.
+        v: snapshot version, as in the places-store of app.py. When it matches
+            the current snapshot the tile is cacheable forever; otherwise it is
+            revalidated after a minute.
+    """
+    cache = TileCache()
+
+    @server.route('/tiles/<int:z>/<int:x>/<int:y>.<fmt>')
+    def places_tile(z, x, y, fmt):
+        if (fmt not in ('pbf', 'geojson') or not 0 <= z <= MAX_REQUEST_ZOOM
+                or not (0 <= x < 2 ** z and 0 <= y < 2 ** z)):
+            flask.abort(404)
+        window = flask.request.args.get('window', default_window, type=int)
+        if window not in windows:
+            flask.abort(400)
+        types = [t for t in flask.request.args.getlist('types') if t]
+
+        snapshot = snapshots.get(window)
+        payload, etag = get_tile(snapshot, cache, z, x, y, types, fmt)
+
+        response = conditional_response(
+            payload, f"{snapshot.version}-{etag}",
+            'application/x-protobuf' if fmt == 'pbf' else 'application/geo+json'
+        )
+        response.headers['X-Snapshot-Version'] = snapshot.version
+        if flask.request.args.get('v') == snapshot.version:
+            response.cache_control.public = True
+            response.cache_control.max_age = 31536000
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.public = True
+            response.cache_control.max_age = 60
+        return response
+
+    return server
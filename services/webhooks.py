@@ -0,0 +1,230 @@
+"""
+Receiver for Airtable webhook notifications.
+
+Airtable POSTs a small "ping" to the notification URL whenever a watched
+table changes, signed with the webhook's MAC secret in the
+`X-Airtable-Content-MAC` header. The receiver validates the signature,
+pulls the new change payloads from the Airtable API (from the last cursor
+seen by this process) and hands the affected record IDs to `on_change`.
+
+For local testing, a notification may carry the payloads inline under a
+`payloads` key, in which case the Airtable API is not called. Run
+`python -m services.webhooks --help` to post a signed sample payload to a
+running app.
+
+Airtable disables a webhook 7 days after it was created or last refreshed,
+so `WebhookRefresher` refreshes it once a day.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import threading
+
+import flask
+import requests
+
+AIRTABLE_API_URL = 'https://api.airtable.com/v0'
+MAC_HEADER = 'X-Airtable-Content-MAC'
+
+logger = logging.getLogger(__name__)
+
+
+def sign(body, secret_base64):
+    """Returns the `X-Airtable-Content-MAC` header value for `body` (bytes)."""
+    digest = hmac.new(base64.b64decode(secret_base64), body, hashlib.sha256).hexdigest()
+    return f"hmac-sha256={digest}"
+
+
+def is_valid_signature(body, header, secret_base64):
+    if not header:
+        return False
+    try:
+        expected = sign(body, secret_base64)
+    except (ValueError, TypeError):
+        return False
+    return hmac.compare_digest(expected, header)
+
+
+def collect_changes(payloads):
+    """
+    Reduces Airtable webhook payloads to the affected record IDs per table.
+
+    Returns:
+        dict: {table_id: {'changed': set, 'destroyed': set}}, where 'changed'
+            covers both created and updated records.
+    """
+    changes = {}
+    for payload in payloads:
+        for table_id, table_changes in (payload.get('changedTablesById') or {}).items():
+            entry = changes.setdefault(table_id, {'changed': set(), 'destroyed': set()})
+            entry['changed'].update(table_changes.get('changedRecordsById') or {})
+            entry['changed'].update(table_changes.get('createdRecordsById') or {})
+            entry['destroyed'].update(table_changes.get('destroyedRecordIds') or [])
+    for entry in changes.values():
+        # A record created/updated and then deleted in the same batch is just gone
+        entry['changed'] -= entry['destroyed']
+    return changes
+
+
+class PayloadCursor:
+    """Fetches webhook payloads from the Airtable API, remembering the cursor."""
+
+    def __init__(self, api_key, base_id, webhook_id):
+        self.url = f"{AIRTABLE_API_URL}/bases/{base_id}/webhooks/{webhook_id}/payloads"
+        self.headers = {'Authorization': f"Bearer {api_key}"}
+        # Payloads are retained by Airtable for 7 days; a fresh process starts
+        # from the oldest one, which at worst refreshes a few records twice
+        self.cursor = 1
+        self._lock = threading.Lock()
+
+    def _fetch(self, cursor):
+        payloads = []
+        while True:
+            response = requests.get(
+                self.url, headers=self.headers, params={'cursor': cursor}, timeout=10
+            )
+            response.raise_for_status()
+            data = response.json()
+            payloads.extend(data.get('payloads') or [])
+            cursor = data.get('cursor', cursor)
+            if not data.get('mightHaveMore'):
+                break
+        return payloads, cursor
+
+    def consume(self, handle):
+        """
+        Passes the payloads after the cursor to `handle` and returns its result.
+        The cursor only moves forward once `handle` returns, so payloads whose
+        handling failed (e.g. an Airtable error while refetching records) are
+        fetched again on the next notification.
+        """
+        with self._lock:
+            payloads, cursor = self._fetch(self.cursor)
+            result = handle(payloads)
+            self.cursor = cursor
+            return result
+
+
+class WebhookRefresher:
+    """
+    Refreshes a webhook from a daemon thread, once at start and then every
+    `interval` seconds, so it does not expire while the app is running.
+
+    Args:
+        on_expired (callable): Called once, from the refresh thread, the first
+            time a refresh fails. The webhook may no longer push changes from
+            then on, so the app should go back to reloading its data regularly.
+    """
+
+    def __init__(self, api_key, base_id, webhook_id, on_expired, interval=24 * 3600):
+        self.url = f"{AIRTABLE_API_URL}/bases/{base_id}/webhooks/{webhook_id}/refresh"
+        self.headers = {'Authorization': f"Bearer {api_key}"}
+        self.on_expired = on_expired
+        self.interval = interval
+        self.expired = False
+        self._stop = threading.Event()
+
+    def refresh(self):
+        """Returns whether Airtable extended the webhook's expiration time."""
+        try:
+            response = requests.post(self.url, headers=self.headers, timeout=10)
+            response.raise_for_status()
+            return True
+        except requests.RequestException as e:
+            logger.warning("Could not refresh the Airtable webhook: %s", e)
+            return False
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self.refresh() and not self.expired:
+                self.expired = True
+                self.on_expired()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        threading.Thread(target=self._run, name='webhook-refresher', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+def register_webhook_routes(server, secret_base64, on_change, payload_cursor=None,
+                            route='/airtable/webhook'):
+    """
+    Adds the webhook notification route to the Flask server.
+
+    Args:
+        secret_base64 (str): `macSecretBase64` returned when the webhook was created.
+        on_change (callable): Called with the output of `collect_changes`.
+        payload_cursor (PayloadCursor, optional): Used to pull payloads for
+            notifications that do not carry them inline.
+    """
+    @server.route(route, methods=['POST'])
+    def airtable_webhook():
+        body = flask.request.get_data()
+        if not is_valid_signature(body, flask.request.headers.get(MAC_HEADER), secret_base64):
+            flask.abort(401)
+        try:
+            notification = json.loads(body)
+        except ValueError:
+            flask.abort(400)
+        if not isinstance(notification, dict):
+            flask.abort(400)
+
+        def handle(payloads):
+            changes = collect_changes(payloads)
+            if changes:
+                on_change(changes)
+            return changes
+
+        payloads = notification.get('payloads')
+        if payloads is not None:
+            if not isinstance(payloads, list) or not all(isinstance(p, dict) for p in payloads):
+                flask.abort(400)
+            changes = handle(payloads)
+        elif payload_cursor is not None:
+            changes = payload_cursor.consume(handle)
+        else:
+            flask.abort(400)
+        return flask.jsonify({'tables': sorted(changes)})
+
+    return server
+
+
+if __name__ == '__main__':
+    # Local stand-in for Airtable: posts a signed notification with inline payloads
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Post a sample Airtable webhook notification.")
+    parser.add_argument('--url', default='http://localhost:8050/airtable/webhook')
+    parser.add_argument('--table', required=True, help="Table ID the records belong to")
+    parser.add_argument('--changed', nargs='*', default=[], help="Created or updated record IDs")
+    parser.add_argument('--destroyed', nargs='*', default=[], help="Deleted record IDs")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    sample = {
+        'payloads': [{
+            'changedTablesById': {
+                args.table: {
+                    'changedRecordsById': {rid: {} for rid in args.changed},
+                    'destroyedRecordIds': args.destroyed,
+                }
+            }
+        }]
+    }
+    body = json.dumps(sample).encode('utf-8')
+    response = requests.post(
+        args.url, data=body, timeout=30,
+        headers={
+            'Content-Type': 'application/json',
+            MAC_HEADER: sign(body, os.environ['AIRTABLE_WEBHOOK_SECRET']),
+        }
+    )
+    print(response.status_code, response.text)